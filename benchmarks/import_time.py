@@ -0,0 +1,102 @@
+"""
+Import-time profile of the modules a cold replica loads before the first paint.
+
+Runs `python -X importtime` in a fresh interpreter per target, after streamlit itself is
+imported (that cost is the same for every Streamlit app), and reports the median of
+several runs plus the heaviest modules each target pulls in.
+
+    python benchmarks/import_time.py              # print the report
+    python benchmarks/import_time.py --write      # also update benchmarks/import_time.md
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(ROOT, "benchmarks", "import_time.md")
+
+# What main.py imports at module level, then the pages it routes to
+TARGETS = (
+    ("main.py imports", "utils.counter,utils.init,utils.assets,utils.tracing,utils.metrics,utils.warmup,utils.speculative"),
+    ("pages.1_upload", "pages.1_upload"),
+    ("pages.2_process", "pages.2_process"),
+    ("pages.3_result", "pages.3_result"),
+    # Deferred to the warm-up thread / first use
+    ("registry: captioner", "utils.groq_image_captioner"),
+    ("registry: translation", "utils.translation"),
+    ("registry: generator", "utils.pollinations_generator,utils.generator_backends"),
+)
+
+
+def profile(modules: str) -> dict:
+    """{module: (self_us, cumulative_us, depth)} for everything imported after streamlit"""
+    code = "import streamlit, importlib\nfor m in %r.split(','): importlib.import_module(m)" % modules
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = {}
+    seen_streamlit = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[13:]:
+            continue
+        self_us, cumulative_us, name = line[12:].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if not seen_streamlit:
+            seen_streamlit = name == "streamlit" and depth == 0
+            continue
+        entries[name] = (int(self_us), int(cumulative_us), depth)
+    return entries
+
+
+def measure(modules: str, runs: int):
+    totals = []
+    last = {}
+    for _ in range(runs):
+        last = profile(modules)
+        totals.append(sum(cumulative for _, cumulative, depth in last.values() if depth == 0))
+    heaviest = sorted(
+        ((name, cumulative) for name, (_, cumulative, depth) in last.items() if depth <= 1),
+        key=lambda item: item[1], reverse=True,
+    )[:5]
+    return statistics.median(totals) / 1000, heaviest
+
+
+def render(results, runs: int) -> str:
+    lines = [
+        "# Import-time profile",
+        "",
+        f"Generated by `python benchmarks/import_time.py --write` on {date.today().isoformat()}, "
+        f"Python {sys.version.split()[0]}, median of {runs} runs. Times exclude `import streamlit`.",
+        "",
+        "| Target | Import time (ms) | Heaviest imports (ms) |",
+        "| --- | ---: | --- |",
+    ]
+    for label, total_ms, heaviest in results:
+        top = ", ".join(f"`{name}` {cumulative / 1000:.0f}" for name, cumulative in heaviest) or "-"
+        lines.append(f"| {label} | {total_ms:.0f} | {top} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--write", action="store_true", help=f"write the report to {os.path.relpath(REPORT_PATH, ROOT)}")
+    args = parser.parse_args()
+
+    results = [(label, *measure(modules, args.runs)) for label, modules in TARGETS]
+    report = render(results, args.runs)
+    print(report)
+    if args.write:
+        with open(REPORT_PATH, "w", encoding="utf-8") as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
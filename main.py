@@ -1,12 +1,17 @@
 # main.py [the template page]
 import streamlit as st
 import importlib
-import os
+import logging
 from datetime import datetime
 import pytz
-from utils.counter import increment_user_count, get_user_count
+from utils.counter import increment_user_count, get_user_count, get_last_datetime_use, set_last_datetime_use
 from utils.init import initialize
+from utils.assets import assets
 from utils.shared_styles import apply_styles
+from utils import tracing
+from utils.metrics import metrics, start_metrics_server
+from utils.warmup import start_warmup
+from utils.speculative import cancel_speculation
 
 # # Clear all cache
 # st.cache_data.clear()
@@ -16,6 +21,11 @@ from utils.shared_styles import apply_styles
 # for key in list(st.session_state.keys()):
 #     del st.session_state[key]
 
+logging.basicConfig(level=logging.INFO)
+
+# Side port for Prometheus scrapes; starts once per process, no-op without METRICS_PORT
+start_metrics_server()
+
 # Set page config for better mobile responsiveness
 st.set_page_config(
     layout="wide", 
@@ -36,9 +46,13 @@ if 'state' not in st.session_state:
     }
 
 # Initialize other session state variables
-for key in ['generated_image', 'selected_image', 'image_description', 'prompt', 'selected_style']:
+for key in ['generated_image', 'selected_image', 'image_description', 'prompt', 'selected_style', 'caption_stream', 'speculation']:
     st.session_state.setdefault(key, None if key != 'image_description' else "")
 
+# One trace per browser session; every span of every rerun carries it
+st.session_state.setdefault('trace_id', tracing.new_trace_id())
+tracing.set_trace_id(st.session_state.trace_id)
+
 def hide_streamlit_header_footer():
     hide_st_style = """
     <style>
@@ -50,9 +64,18 @@ def hide_streamlit_header_footer():
     """
     st.markdown(hide_st_style, unsafe_allow_html=True)
 
+def load_page(name):
+    """
+    Page modules are imported on first use; after the first paint the warm-up thread preloads them.
+    Always goes through import_module: if warm-up is mid-import it waits for the module to finish.
+    """
+    module_name = "pages." + name
+    with tracing.span("import", module=module_name):
+        return importlib.import_module(module_name)
+
 def load_html_file(file_name):
-    with open(file_name, 'r', encoding='utf-8') as f:
-        return f.read()
+    # Cached and minified once per process
+    return assets.text(file_name)
     
 def main():
     # Apply shared styles
@@ -70,8 +93,12 @@ def main():
         #### Import and run the pages ###
         try:
             upload_page = st.session_state.state['current_page']
-            upload_page = importlib.import_module("pages." + upload_page)
-            upload_page.main()
+            if upload_page != '2_process':
+                # Background guesses only help while the user is picking a style
+                cancel_speculation(st.session_state)
+            with tracing.span(f"page.{upload_page}"):
+                upload_page = load_page(upload_page)
+                upload_page.main()
             
         except Exception as e:
             st.error(f"Error loading upload page: {e}")
@@ -86,7 +113,7 @@ def main():
     st.markdown(f"<p class='user-count' style='color: #4B0082;'>סה\"כ משתמשים: {user_count}</p>", unsafe_allow_html=True)
 
     # Display and update last datetime use
-    last_datetime_use = os.getenv("LAST_DATETIME_USE")
+    last_datetime_use = get_last_datetime_use()
     st.markdown(f"<p class='last-datetime-use'>משתמש אחרון נכנס ב {last_datetime_use}</p>", unsafe_allow_html=True)
 
     # Update LAST_DATETIME_USE on first visit
@@ -94,13 +121,21 @@ def main():
         st.session_state.initial_visit = True
         israel_time = datetime.now(pytz.timezone("Asia/Jerusalem"))
         formatted_time = israel_time.strftime("%d/%m/%Y %H:%M")
-        os.environ['LAST_DATETIME_USE'] = formatted_time
+        set_last_datetime_use(formatted_time)
+
+    # The first page is on screen: preload the rest of the app in the background
+    start_warmup()
 
 if __name__ == "__main__":
     # Increment user count on first load
     if 'counted' not in st.session_state:
         st.session_state.counted = True
-        increment_user_count()
+        try:
+            increment_user_count()
+        except Exception as e:
+            # The count is cosmetic; an unreachable counter store must not take the page down
+            print(f"Error counting the visit: {str(e)}")
+        metrics.counter("app_sessions_total", "Browser sessions started since the process started").inc()
     
    
         
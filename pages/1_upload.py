@@ -1,106 +1,61 @@
 # pages/1_upload.py
 import streamlit as st
-from utils.groq_image_captioner import GroqImageCaptioner
-import base64
+from utils.registry import get_captioner
+from utils.sample_gallery import SampleGallery
+from utils.caption_stream import CaptionStream, clean_text
+from utils.image_payload import ImagePayload
 from io import BytesIO
-from PIL import Image
-import os
 from utils.shared_styles import apply_styles
+from utils import tracing
 
-def clean_text(text):
-    """Clean text from HTML tags and normalize line breaks"""
-    if not text:
-        return ""
-    # Replace HTML line breaks with spaces
-    text = text.replace('<br>', ' ').replace('<br/>', ' ').replace('<br />', ' ')
-    # Replace multiple spaces with single space
-    text = ' '.join(text.split())
-    return text
+@st.cache_resource
+def load_sample_gallery():
+    """Build the sample gallery index once per process"""
+    return SampleGallery("examples")
 
-def load_sample_images():
-    """Load sample images from examples directory"""
-    examples_dir = "examples"
-    images = []
-    if os.path.exists(examples_dir):
-        for filename in os.listdir(examples_dir):
-            file_path = os.path.join(examples_dir, filename)
-            try:
-                with open(file_path, "rb") as img_file:
-                    image_uri = f"data:image/{filename.split('.')[-1]};base64,{base64.b64encode(img_file.read()).decode()}"
-                images.append(image_uri)
-            except Exception:
-                continue
-    return images
-
-def decode_base64_to_bytes(base64_string):
-    """Convert base64 string to bytes"""
-    if ',' in base64_string:
-        base64_string = base64_string.split(',')[1]
-    return BytesIO(base64.b64decode(base64_string))
-
-def convert_to_base64(image_data):
-    """Convert image data to base64 data URI"""
+def to_image_payload(image_data):
+    """Wrap uploaded/camera/sample bytes in an ImagePayload"""
     try:
-        if isinstance(image_data, BytesIO):
-            image_bytes = image_data.getvalue()
-        else:
-            image_bytes = image_data.getvalue()
-            
-        # Get image format
-        image = Image.open(BytesIO(image_bytes))
-        img_format = image.format.lower() if image.format else 'jpeg'
-        
-        # Convert to base64
-        base64_str = base64.b64encode(image_bytes).decode()
-        return f"data:image/{img_format};base64,{base64_str}"
+        with tracing.span("decode"):
+            return ImagePayload.from_bytes(image_data.getvalue())
     except Exception as e:
         st.error(f"שגיאה בהמרת תמונה: {e}")
         return None
 
 def process_image(image_data):
-    """עיבוד תמונה ל-BytesIO ולתיאור"""
+    """עיבוד תמונה ל-BytesIO ולתיאור - מחזיר את התמונה ואת זרם התיאור"""
     try:
         with st.spinner('אני מנתח את התמונה...'):
-            captioner = GroqImageCaptioner()
+            captioner = get_captioner()
             
-            if isinstance(image_data, BytesIO):
-                image_bytesio = image_data
-            else:
-                image_bytesio = BytesIO(image_data.getvalue())
+            payload = to_image_payload(image_data)
+            if payload is None:
+                return None, None
             
-            img_format = Image.open(image_bytesio).format or 'PNG'
-            image_bytesio.seek(0)
-            
-            result = captioner.process_bytesio_image(image_bytesio, format=img_format)
-            if result and len(result) == 2:
-                base64_image, description = result
-                if description:
-                    # If it's already a base64 image, return it directly
-                    if base64_image.startswith('data:image'):
-                        return base64_image, description
-                    # Otherwise convert to base64
-                    image_base64 = convert_to_base64(image_bytesio)
-                    return image_base64, description
-            return None, None
+            # Show the description as it arrives and move on after the first sentence
+            stream = CaptionStream(captioner.stream_bytesio_image(payload.bytesio(), format=payload.format.upper()))
+            preview = st.empty()
+            while not stream.wait_for_first_sentence(timeout=0.2):
+                preview.markdown(stream.text)
+            preview.empty()
+
+            if not stream.text:
+                return None, None
+            return payload, stream
     except Exception as e:
         st.error(f"שגיאה בעיבוד תמונה: {e}")
         return None, None
 
 def process_and_navigate(image_data, is_sample=False):
     """Process image and navigate to next page"""
-    if is_sample:
-        img_bytes = decode_base64_to_bytes(image_data)
-        image, description = process_image(img_bytes)
-        if image:
-            st.session_state.selected_image = image
-            st.session_state.image_description = clean_text(description)
-        else:
-            st.session_state.selected_image = image_data
-    else:
-        image, description = process_image(image_data)
-        if image:
-            st.session_state.selected_image = image
-            st.session_state.image_description = clean_text(description)
+    image, stream = process_image(image_data)
+    if image:
+        st.session_state.selected_image = image
+        st.session_state.image_description = clean_text(stream.text)
+        # The rest of the description keeps streaming into the process page
+        st.session_state.caption_stream = None if stream.done else stream
+    elif is_sample:
+        st.session_state.selected_image = to_image_payload(image_data)
             
     # Set state and navigate to next page
     st.session_state.state['image_uploaded'] = True
@@ -138,13 +93,13 @@ def main():
     
     else:  # Sample images
         with st.spinner('אני טוען תמונות לדוגמה...'):
-            sample_images = load_sample_images()
+            sample_images = load_sample_gallery().samples()
             cols = st.columns(2)
-            for idx, img in enumerate(sample_images):
+            for idx, sample in enumerate(sample_images):
                 with cols[idx % 2]:
-                    st.image(img)
+                    st.image(sample.thumbnail)
                     if st.button("בחרו תמונה זו", key=f"sample_{idx}"):
-                        process_and_navigate(img, is_sample=True)
+                        process_and_navigate(BytesIO(sample.read_bytes()), is_sample=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,57 +1,60 @@
 # pages/2_✨_process.py sagi
 import asyncio
-import base64
-from io import BytesIO
 import streamlit as st
-from deep_translator import GoogleTranslator
-import json
-from utils.TelegramSender import TelegramSender
-from utils.pollinations_generator import PollinationsGenerator
+from utils.registry import get_captioner, get_generator, get_telegram_dispatcher, get_translation_service, get_style_catalog, get_speculative_scheduler
+from utils import http_client
 from utils.shared_styles import apply_styles
-import re
-
-@st.cache_data
-def load_styles():
-    """Load and sort styles"""
-    try:
-        with open('data/image_styles.json', 'r', encoding='utf-8') as f:
-            styles = json.load(f).get('styles', [])
-            free_style = [style for style in styles if style['name'] == "סגנון חופשי"]
-            other_styles = [style for style in styles if style['name'] != "סגנון חופשי"]
-            sorted_other_styles = sorted(other_styles, key=lambda x: x['name'])
-            return free_style + sorted_other_styles
-    except Exception as e:
-        st.error(f"שגיאה בטעינת הסגנונות: {e}")
-        return []
-
-def translate(text, target='en'):
-    """Translate text using Google Translator"""
+from utils.assets import assets
+from utils.caption_stream import clean_text
+from utils.image_payload import ImagePayload
+from utils.style_grid import load_styles, style_comparison_section
+from utils.speculative import ENABLED as SPECULATIVE_ENABLED, cancel_speculation
+from utils import tracing
+
+async def translate(text, target='en'):
+    """Translate text through the shared, cached translation service"""
     if not text:
         return ""
     try:
-        translator = GoogleTranslator(source='auto', target=target)
-        return translator.translate(text)
+        return await get_translation_service().translate_async(text, target)
     except Exception as e:
         st.error(f"שגיאה בתרגום: {e}")
         return text
 
-def generate_image_with_style(style, prompt):
+def start_speculation(prompt):
+    """Pre-generate the likeliest styles for this description while the user decides"""
+    speculation = st.session_state.get('speculation')
+    if speculation is not None and speculation.matches(prompt):
+        return
+    cancel_speculation(st.session_state)
+    try:
+        st.session_state.speculation = get_speculative_scheduler().start(prompt)
+    except Exception as e:
+        print(f"Speculative generation not started: {str(e)}")
+
+async def generate_image_with_style(style, prompt):
     """Generate image with selected style"""
     if not prompt:
         st.warning("נא להוסיף תיאור לתמונה")
         return False
         
-    full_prompt = f"{style['prompt_prefix']} {translate(prompt, 'en')}"
+    full_prompt = f"{style.prompt_prefix} {await translate(prompt, 'en')}"
     st.session_state.prompt = prompt
-    st.session_state.selected_style = style['name']
+    st.session_state.selected_style = style.name
     
     with st.toast('אני יוצר את הקסם... (זה יכול לקחת עד 30 שניות)... המתינו עד שתראו ❄️❄️❄️'):
     # with st.spinner('אני יוצר את הקסם... (זה יכול לקחת עד 30 שניות)'):
-        generator = PollinationsGenerator()
-        model = style.get('model', 'flux')
+        generator = get_generator()
+        model = style.model
+
+        speculation = st.session_state.get('speculation')
+        if speculation is not None:
+            # This style may already be generating in the background: wait for it, then hit the cache
+            await speculation.wait(style.name, prompt)
         
-        st.session_state.generated_image = generator.generate_image(full_prompt, model)
+        st.session_state.generated_image = await generator.generate_image_async(full_prompt, model, style=style.name)
         if st.session_state.generated_image:
+            get_style_catalog().record_usage(style.name)
             st.session_state.state['image_processed'] = True
             return True
         else:
@@ -59,75 +62,32 @@ def generate_image_with_style(style, prompt):
             return False
 
 
-async def send_telegram_image(image_data: str, caption: str):
-    """Send image to Telegram"""
+async def finish_caption_stream(stream):
+    """Store the complete streamed description once the captioner is done"""
+    await asyncio.to_thread(stream.wait)
+    if stream.text:
+        st.session_state.image_description = clean_text(stream.text)
+    st.session_state.caption_stream = None
+
+async def caption_again(image: ImagePayload):
+    """Captioning on the upload page produced nothing; retry here without blocking the loop"""
+    with st.spinner('אני קורא את תוכן התמונה...'), tracing.span("caption", retry=True):
+        _, description = await get_captioner().process_bytesio_image_async(image.bytesio(), format=image.format.upper())
+    if description:
+        st.session_state.image_description = clean_text(description)
+
+def send_telegram_image(image: ImagePayload, caption: str):
+    """Queue the image for Telegram; the dispatcher sends it in the background"""
     try:
-        if ',' in image_data:
-            image_base64 = image_data.split(',')[1]
-        else:
-            image_base64 = image_data
-        
-        image_bytes = BytesIO(base64.b64decode(image_base64))
-        telegram_sender = TelegramSender()
-        
-        if await telegram_sender.verify_bot_token():
-            await telegram_sender.send_photo_bytes(image_bytes, caption=caption)
-        else:
-            raise Exception("Bot token verification failed")
+        get_telegram_dispatcher().enqueue(image, caption)
     except Exception as e:
-        print(f"Failed to send to Telegram: {str(e)}")
-    finally:
-        await telegram_sender.close_session()
+        print(f"Failed to queue Telegram notification: {str(e)}")
         
 async def main_async():
     # Apply shared styles including button effects
     # apply_styles()
-    st.markdown("""
-        <style>
-            /* Remove extra margins and padding */
-            .stButton {
-                margin: 0 !important;
-                padding: 0 !important;
-            }
-            
-            /* Style the button itself */
-            .stButton > button {
-                margin: 2px 0 !important;
-                padding: 10px !important;
-                width: 100% !important;
-                border-radius: 8px !important;
-                background-color: #2196F3 !important;
-                color: white !important;
-                height: auto !important;
-                min-height: 40px !important;
-            }
-            
-            /* Remove column gap */
-            div.row-widget.stHorizontal > div {
-                margin-bottom: 0 !important;
-                padding: 0 5px !important;
-            }
-            
-            /* Fix vertical spacing */
-            div.element-container {
-                margin: 1px !important;
-                padding: 0 !important;
-            }
-            
-            /* Container styling */
-            .style-container {
-                padding: 1rem;
-                border-radius: 10px;
-                margin: 0.5rem 0;
-                background-color: #f8f9fa;
-            }
-            
-            /* Remove extra padding from columns */
-            div.stColumn {
-                padding: 0 5px !important;
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    # Button and column layout shared by the process and result pages
+    st.markdown(assets.css('utils/pages.css'), unsafe_allow_html=True)
 
     # Check page state
     if not st.session_state.state.get('image_uploaded'):
@@ -141,6 +101,7 @@ async def main_async():
 
     # Optional: Add button to start over
     if st.button("להתחיל מחדש 🔄"):
+        cancel_speculation(st.session_state)
         st.session_state.state['current_page'] = '1_upload'
         st.session_state.state['image_uploaded'] = False
         st.session_state.state['image_processed'] = False
@@ -148,19 +109,41 @@ async def main_async():
         st.session_state.state['selected_style'] = False
         st.session_state.selected_image = None
         st.session_state.generated_image = None
+        st.session_state.caption_stream = None
+        st.session_state.compare_results = None
         st.rerun()        
     
-    st.image(st.session_state.selected_image)
+    st.image(st.session_state.selected_image.data)
 
     styles = load_styles()
 
-    with st.spinner('אני קורא את תוכן התמונה...'):
-        prompt = st.text_area(
-            "תיאור התמונה",
-            value=translate(st.session_state.image_description, 'iw'),
-            height=200,
-            placeholder="תוכלו לערוך את התיאור כרצונכם..."
-        )
+    caption_stream = st.session_state.get('caption_stream')
+    if caption_stream is not None and caption_stream.done:
+        await finish_caption_stream(caption_stream)
+        caption_stream = None
+
+    if (caption_stream is None and not st.session_state.image_description
+            and st.session_state.get('caption_retried_for') is not st.session_state.selected_image):
+        st.session_state.caption_retried_for = st.session_state.selected_image
+        await caption_again(st.session_state.selected_image)
+
+    if caption_stream is None:
+        with st.spinner('אני קורא את תוכן התמונה...'):
+            prompt = st.text_area(
+                "תיאור התמונה",
+                value=await translate(st.session_state.image_description, 'iw'),
+                height=200,
+                placeholder="תוכלו לערוך את התיאור כרצונכם..."
+            )
+        # Translate back to English while the user is still picking a style
+        get_translation_service().prefetch(prompt, 'en')
+        if SPECULATIVE_ENABLED:
+            start_speculation(prompt)
+    else:
+        # Description is still streaming: show it read-only, the style picker stays usable
+        description_placeholder = st.empty()
+        description_placeholder.markdown(caption_stream.text)
+        prompt = None
 
     st.markdown("""
         <div class='style-container'>
@@ -173,38 +156,50 @@ async def main_async():
     for idx, style in enumerate(styles):
         with cols[idx % 2]:
             if st.button(
-                f"{style['name']}",
+                f"{style.name}",
                 key=f"style_{idx}"
             ):
-                if generate_image_with_style(style, prompt):
+                if prompt is None:
+                    await finish_caption_stream(caption_stream)
+                    prompt = await translate(st.session_state.image_description, 'iw')
+                if await generate_image_with_style(style, prompt):
                     # Send to Telegram
                     telegram_caption = f"New image generated\nPrompt: {st.session_state.prompt}\nStyle: {st.session_state.selected_style}"
-                    try:
-                        new_image=st.session_state.generated_image
-                        await send_telegram_image(new_image, telegram_caption)
-                    except Exception as e:
-                        print(f"Error sending to Telegram: {e}")
+                    send_telegram_image(st.session_state.generated_image, telegram_caption)
                     st.rerun()
 
+    async def comparison_prompt():
+        text = prompt
+        if text is None:
+            await finish_caption_stream(caption_stream)
+            text = await translate(st.session_state.image_description, 'iw')
+        st.session_state.prompt = text
+        return await translate(text, 'en')
+
+    comparison = await style_comparison_section(styles, comparison_prompt)
+    if comparison:
+        st.session_state.selected_style, st.session_state.generated_image = comparison
+        telegram_caption = f"New image generated\nPrompt: {st.session_state.prompt}\nStyle: {st.session_state.selected_style}"
+        send_telegram_image(st.session_state.generated_image, telegram_caption)
+
     # Handle successful generation
     if st.session_state.generated_image:
         st.session_state.state['image_processed'] = True
         st.session_state.state['current_page'] = '3_result'
         st.rerun()
 
-    def display_base64_image(data_uri):
-        # Extract base64 part from data URI
-        match = re.match(r"data:image/[^;]+;base64,(.*)", data_uri)
-        if match:
-            img_bytes = base64.b64decode(match.group(1))
-            st.image(BytesIO(img_bytes))
-        else:
-            st.image(data_uri)  # fallback for other formats
+    if caption_stream is not None:
+        while not caption_stream.done:
+            description_placeholder.markdown(caption_stream.text)
+            await asyncio.sleep(0.2)
+        await finish_caption_stream(caption_stream)
+        st.rerun()
 
-    display_base64_image(st.session_state.generated_image)
+    if st.session_state.generated_image:
+        st.image(st.session_state.generated_image.data)
 
 def main():
-    asyncio.run(main_async())
+    http_client.run(main_async())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
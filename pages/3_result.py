@@ -1,65 +1,29 @@
 # pages/3_result.py sagi 23:00
 import streamlit as st
-import base64
-from io import BytesIO
 import asyncio
-import json
-from utils.greenapi import WhatsAppSender
-from utils.TelegramSender import TelegramSender
-from utils.pollinations_generator import PollinationsGenerator
-from deep_translator import GoogleTranslator
+from utils.registry import get_generator, get_telegram_dispatcher, get_whatsapp_sender, get_translation_service, get_style_catalog
+from utils import http_client
 from utils.shared_styles import apply_styles
-import re
+from utils.assets import assets
+from utils.image_payload import ImagePayload
+from utils.style_grid import load_styles, style_comparison_section
 
-@st.cache_data
-def load_styles():
-    """Load and sort styles"""
-    try:
-        with open('data/image_styles.json', 'r', encoding='utf-8') as f:
-            styles = json.load(f).get('styles', [])
-            free_style = [style for style in styles if style['name'] == "סגנון חופשי"]
-            other_styles = [style for style in styles if style['name'] != "סגנון חופשי"]
-            sorted_other_styles = sorted(other_styles, key=lambda x: x['name'])
-            return free_style + sorted_other_styles
-    except Exception as e:
-        st.error(f"שגיאה בטעינת הסגנונות: {e}")
-        return []
-
-def translate(text, target='en'):
-    """Translate text using Google Translator"""
+async def translate(text, target='en'):
+    """Translate text through the shared, cached translation service"""
     if not text:
         return ""
     try:
-        translator = GoogleTranslator(source='auto', target=target)
-        return translator.translate(text)
+        return await get_translation_service().translate_async(text, target)
     except Exception as e:
         st.error(f"שגיאה בתרגום: {e}")
         return text
 
-async def send_telegram_image(image_data: str, caption: str):
-    """Send image to Telegram"""
+def send_telegram_image(image: ImagePayload, caption: str):
+    """Queue the image for Telegram; the dispatcher sends it in the background"""
     try:
-        if ',' in image_data:
-            image_base64 = image_data.split(',')[1]
-        else:
-            image_base64 = image_data
-        
-        image_bytes = BytesIO(base64.b64decode(image_base64))
-        telegram_sender = TelegramSender()
-        
-        if await telegram_sender.verify_bot_token():
-            await telegram_sender.send_photo_bytes(image_bytes, caption=caption)
-        else:
-            raise Exception("Bot token verification failed")
+        get_telegram_dispatcher().enqueue(image, caption)
     except Exception as e:
-        print(f"Failed to send to Telegram: {str(e)}")
-    finally:
-        await telegram_sender.close_session()
-
-@st.cache_resource
-def load_whatsapp_sender():
-    """Initialize WhatsApp sender once"""
-    return WhatsAppSender()
+        print(f"Failed to queue Telegram notification: {str(e)}")
 
 def style_section():
     """Create the style selection section"""
@@ -72,7 +36,7 @@ def style_section():
     styles = load_styles()
     new_style = st.selectbox(
         "בחרו סגנון חדש לתמונה שלכם",
-        [s['name'] for s in styles],
+        [s.name for s in styles],
         index=0
     )
     
@@ -97,52 +61,8 @@ def whatsapp_section():
 
 async def main_async():
     # apply_styles()
-    st.markdown("""
-        <style>
-            /* Remove extra margins and padding */
-            .stButton {
-                margin: 0 !important;
-                padding: 0 !important;
-            }
-            
-            /* Style the button itself */
-            .stButton > button {
-                margin: 2px 0 !important;
-                padding: 10px !important;
-                width: 100% !important;
-                border-radius: 8px !important;
-                background-color: #2196F3 !important;
-                color: white !important;
-                height: auto !important;
-                min-height: 40px !important;
-            }
-            
-            /* Remove column gap */
-            div.row-widget.stHorizontal > div {
-                margin-bottom: 0 !important;
-                padding: 0 5px !important;
-            }
-            
-            /* Fix vertical spacing */
-            div.element-container {
-                margin: 1px !important;
-                padding: 0 !important;
-            }
-            
-            /* Container styling */
-            .style-container {
-                padding: 1rem;
-                border-radius: 10px;
-                margin: 0.5rem 0;
-                background-color: #f8f9fa;
-            }
-            
-            /* Remove extra padding from columns */
-            div.stColumn {
-                padding: 0 5px !important;
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    # Button and column layout shared by the process and result pages
+    st.markdown(assets.css('utils/pages.css'), unsafe_allow_html=True)
     
     # Check if we should be on this page
     if not st.session_state.state.get('image_processed'):
@@ -164,6 +84,8 @@ async def main_async():
         st.session_state.state['selected_style'] = False
         st.session_state.selected_image = None
         st.session_state.generated_image = None
+        st.session_state.caption_stream = None
+        st.session_state.compare_results = None
         st.rerun()
 
     # Display title and image
@@ -173,16 +95,8 @@ async def main_async():
     </div>
     """, unsafe_allow_html=True)
     
-    if st.session_state.get("generated_image") and st.session_state.generated_image not in [None, ""]:
-        def display_base64_image(data_uri):
-            match = re.match(r"data:image/[^;]+;base64,(.*)", data_uri)
-            if match:
-                img_bytes = base64.b64decode(match.group(1))
-                st.image(BytesIO(img_bytes))
-            else:
-                st.image(data_uri)
-
-        display_base64_image(st.session_state.generated_image)
+    if st.session_state.get("generated_image"):
+        st.image(st.session_state.generated_image.data)
     else:
         st.warning("לא נמצאה תמונה להצגה (No image found to display)")
     
@@ -206,7 +120,7 @@ async def main_async():
     for idx, style in enumerate(styles):
         with cols[idx % 2]:
             if st.button(
-                f"{style['name']}",
+                f"{style.name}",
                 key=f"style_{idx}",
             ):
                 st.session_state.is_generating = True
@@ -214,28 +128,34 @@ async def main_async():
                 
                 # with st.spinner('✨ אני יוצר את הקסם... (זה יכול לקחת עד 30 שניות)'):
                 with st.toast('אני יוצר את הקסם... (זה יכול לקחת עד 30 שניות)... המתינו עד שתראו ❄️❄️❄️'):
-                    generator = PollinationsGenerator()
-                    model = style.get('model', 'flux')
-                    full_prompt = f"{style['prompt_prefix']} {translate(st.session_state.prompt, 'en')}"
+                    generator = get_generator()
+                    model = style.model
+                    full_prompt = f"{style.prompt_prefix} {await translate(st.session_state.prompt, 'en')}"
                     
-                    new_image = generator.generate_image(full_prompt, model)
+                    new_image = await generator.generate_image_async(full_prompt, model, style=style.name)
                     if new_image:
+                        get_style_catalog().record_usage(style.name)
                         st.session_state.generated_image = new_image
-                        st.session_state.selected_style = style['name']
+                        st.session_state.selected_style = style.name
                         st.session_state.is_generating = False
                         st.session_state.show_snow = True  # Enable snow for next display
                         
                         # Send to Telegram
                         telegram_caption = f"New image generated\nPrompt: {st.session_state.prompt}\nStyle: {st.session_state.selected_style}"
-                        try:
-                            await send_telegram_image(new_image, telegram_caption)
-                        except Exception as e:
-                            print(f"Error sending to Telegram: {e}")
+                        send_telegram_image(new_image, telegram_caption)
                         st.rerun()
                     else:
                         st.session_state.is_generating = False
                         st.error('אירעה שגיאה ביצירת התמונה - נסו שוב.')
 
+    comparison = await style_comparison_section(styles, lambda: translate(st.session_state.prompt, 'en'))
+    if comparison:
+        st.session_state.selected_style, st.session_state.generated_image = comparison
+        st.session_state.show_snow = True
+        telegram_caption = f"New image generated\nPrompt: {st.session_state.prompt}\nStyle: {st.session_state.selected_style}"
+        send_telegram_image(st.session_state.generated_image, telegram_caption)
+        st.rerun()
+
     # WhatsApp sharing section
     # st.markdown("""
     # <div class='custom-section'>
@@ -254,11 +174,11 @@ async def main_async():
             try:
                 # with st.spinner("📱 שולח את התמונה בוואטסאפ..."):
                 with st.spinner('אני שולח את ההודעה לוואטסאפ'):
-                    img_data = base64.b64decode(st.session_state.generated_image.split(',')[1])
-                    whatsapp = load_whatsapp_sender()
-                    success = whatsapp.send_image_from_bytesio(
+                    whatsapp = get_whatsapp_sender()
+                    success = await asyncio.to_thread(
+                        whatsapp.send_image,
                         phone=phone,
-                        image_bytesio=BytesIO(img_data),
+                        payload=st.session_state.generated_image,
                         caption="""✨ יצירת אמנות ייחודית שנוצרה במיוחד עבורכם באמצעות מחולל התמונות החכם של שגיא בר-און! 🌟
                         התנסו בעצמכם בכתובת: https://sagi-photo-to-photo.streamlit.app/
                         אהבתם? שתפו את החוויה עם חברים ומשפחה – זה לגמרי בחינם! 🎉"""
@@ -275,7 +195,7 @@ async def main_async():
     st.markdown('</div>', unsafe_allow_html=True)
 
 def main():
-    asyncio.run(main_async())
+    http_client.run(main_async())
 
 if __name__ == "__main__":
     main()
@@ -1,38 +1,113 @@
+import os
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Iterator
 import torch
 from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
-import requests
 from io import BytesIO
 import base64
+from dotenv import load_dotenv
+from utils import http_client
+
+# Load environment variables
+load_dotenv()
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_model(model_name: str, device: str, quantize: bool):
+    """Load processor and model once per process, however many captioners are built"""
+    key = (model_name, device, quantize)
+    with _models_lock:
+        if key not in _models:
+            processor = BlipProcessor.from_pretrained(model_name)
+            model = BlipForConditionalGeneration.from_pretrained(
+                model_name,
+                torch_dtype=torch.float16 if device == "cuda" else torch.float32
+            ).to(device)
+            model.eval()
+            if quantize and device == "cpu":
+                # int8 weights for the Linear layers: smaller and faster on CPU
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            _models[key] = (processor, model)
+        return _models[key]
+
+
+class MicroBatcher:
+    """Groups concurrent caption requests into one generate() call"""
+
+    def __init__(self, run_batch, max_batch: int = 8, max_wait: float = 0.02):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="caption-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image: Image.Image) -> Future:
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+            try:
+                captions = self.run_batch([image for image, _ in batch])
+                for (_, future), caption in zip(batch, captions):
+                    future.set_result(caption)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
 
 class ImageCaptioning:
-    def __init__(self, model_name="Salesforce/blip-image-captioning-base"):
+    def __init__(self, model_name=None):
         """
-        Initializes the ImageCaptioning class by loading the processor and model.
+        Local BLIP captioner with the same interface as GroqImageCaptioner.
         Using base model instead of large for better performance.
         """
+        self.model_name = model_name or os.getenv("LOCAL_CAPTION_MODEL", "Salesforce/blip-image-captioning-base")
         torch.backends.cuda.matmul.allow_tf32 = True  # בשביל ביצועים טובים יותר
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.processor = BlipProcessor.from_pretrained(model_name)
-        self.model = BlipForConditionalGeneration.from_pretrained(
-            model_name,
-            torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
-        ).to(self.device)
+        self.quantize = os.getenv("LOCAL_CAPTION_QUANTIZE", "0") == "1"
+        threads = int(os.getenv("LOCAL_CAPTION_THREADS", "0"))
+        if threads > 0 and self.device == "cpu":
+            torch.set_num_threads(threads)
+        self.max_length = int(os.getenv("LOCAL_CAPTION_MAX_LENGTH", "100"))
+        self.batcher = MicroBatcher(
+            self._caption_batch,
+            max_batch=int(os.getenv("LOCAL_CAPTION_MAX_BATCH", "8")),
+            max_wait=float(os.getenv("LOCAL_CAPTION_MAX_WAIT_MS", "20")) / 1000,
+        )
+
+    def _caption_batch(self, images):
+        processor, model = load_model(self.model_name, self.device, self.quantize)
+        inputs = processor(images=images, return_tensors="pt").to(self.device)
+        with torch.inference_mode():
+            output = model.generate(**inputs, max_length=self.max_length)
+        return processor.batch_decode(output, skip_special_tokens=True)
+
+    def caption(self, image: Image.Image, timeout: float = None) -> str:
+        return self.batcher.submit(image.convert('RGB')).result(timeout)
 
     def describe_image(self, image_url):
         """
         Generates a textual description for the given image URL.
         """
         try:
-            image = Image.open(requests.get(image_url, stream=True).raw).convert('RGB')
-            inputs = self.processor(images=image, return_tensors="pt").to(self.device)
-            
-            with torch.no_grad():
-                output = self.model.generate(**inputs, max_length=100)
-            
-            caption = self.processor.decode(output[0], skip_special_tokens=True)
-            return caption
-            
+            image = Image.open(http_client.get(image_url, stream=True).raw)
+            return self.caption(image)
+
         except Exception as e:
             print(f"Error processing image: {e}")
             return "Could not generate description"
@@ -44,32 +119,29 @@ class ImageCaptioning:
         try:
             # Reset BytesIO position
             image_bytes.seek(0)
-            
-            # Open and convert image
-            img = Image.open(image_bytes).convert('RGB')
-                
+
             # Generate description using BLIP model
-            inputs = self.processor(images=img, return_tensors="pt").to(self.device)
-            
-            with torch.no_grad():
-                output = self.model.generate(**inputs, max_length=100)
-            description = self.processor.decode(output[0], skip_special_tokens=True)
-            
-            # Save to a new BytesIO for the URI
-            output_bytes = BytesIO()
-            img.save(output_bytes, format=format)
-            output_bytes.seek(0)
-            
-            # Convert to base64
-            encoded_image = base64.b64encode(output_bytes.getvalue()).decode()
+            description = self.caption(Image.open(image_bytes))
+
+            # The original bytes are already a valid image, no need to re-encode
+            encoded_image = base64.b64encode(image_bytes.getvalue()).decode()
             image_uri = f"data:image/{format.lower()};base64,{encoded_image}"
-            
+
             return image_uri, description
-            
+
         except Exception as e:
             print(f"Error processing image: {str(e)}")
             return None, None
 
+    async def process_bytesio_image_async(self, image_bytes: BytesIO, format: str = "PNG") -> tuple[str, str]:
+        """The model runs on the batcher thread; only the wait happens on the event loop"""
+        return await asyncio.to_thread(self.process_bytesio_image, image_bytes, format)
+
+    def stream_bytesio_image(self, image_bytes: BytesIO, format: str = "PNG") -> Iterator[str]:
+        """BLIP has no token streaming; the caption is yielded in one piece"""
+        image_bytes.seek(0)
+        yield self.caption(Image.open(image_bytes))
+
 # Test functionality
 if __name__ == "__main__":
     captioner = ImageCaptioning()
@@ -77,4 +149,4 @@ if __name__ == "__main__":
     image_url = "http://images.cocodataset.org/val2017/000000039769.jpg"
     print("Testing image description...")
     description = captioner.describe_image(image_url)
-    print(f"Description: {description}")
\ No newline at end of file
+    print(f"Description: {description}")
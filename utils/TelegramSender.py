@@ -1,9 +1,11 @@
 import os
+import json
 from dotenv import load_dotenv
-import asyncio
 import aiohttp
-from typing import Optional
+from typing import List, Optional, Tuple
 from io import BytesIO
+from utils import http_client
+from utils.image_payload import ImagePayload
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,15 +18,15 @@ class TelegramSender:
         if not self.bot_token or not self.chat_id:
             raise ValueError("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID must be set in environment variables")
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
-        self.session = None
 
     async def ensure_session(self):
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+        # Pooled session of the running loop. Not stored on self: one sender is
+        # shared by every Streamlit session, each running its own event loop.
+        return http_client.get_async_session()
 
     async def close_session(self):
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Nothing to release; http_client closes the pool when the loop ends"""
+        return None
 
     def _truncate_caption(self, caption: str) -> str:
         """Truncate caption to comply with Telegram's limits"""
@@ -35,10 +37,10 @@ class TelegramSender:
         return caption
 
     async def _make_request(self, method: str, endpoint: str, **kwargs):
-        await self.ensure_session()
+        session = await self.ensure_session()
         url = f"{self.base_url}/{endpoint}"
         try:
-            async with getattr(self.session, method)(url, **kwargs) as response:
+            async with getattr(session, method)(url, **kwargs) as response:
                 if response.status != 200:
                     response_text = await response.text()
                     print(f"Failed to {endpoint}. Status: {response.status}")
@@ -73,6 +75,44 @@ class TelegramSender:
             print(f"Error sending photo: {str(e)}")
             return None
 
+    async def send_image(self, payload: ImagePayload, caption: Optional[str] = None):
+        """Send an ImagePayload as a photo with its real content type"""
+        try:
+            data = aiohttp.FormData()
+            data.add_field("chat_id", self.chat_id)
+            data.add_field("photo", payload.data, filename=f"generated_image.{payload.extension}", content_type=payload.mime_type)
+
+            if caption:
+                data.add_field("caption", self._truncate_caption(caption))
+
+            result = await self._make_request('post', 'sendPhoto', data=data)
+            if result:
+                print("Photo sent successfully to Telegram")
+            return result
+        except Exception as e:
+            print(f"Error sending photo: {str(e)}")
+            return None
+
+    async def send_media_group(self, items: List[Tuple[ImagePayload, Optional[str]]]):
+        """Send 2-10 images as one album, each with its own caption"""
+        try:
+            data = aiohttp.FormData()
+            data.add_field("chat_id", self.chat_id)
+            media = []
+            for idx, (payload, caption) in enumerate(items):
+                name = f"photo{idx}"
+                media.append({"type": "photo", "media": f"attach://{name}", "caption": self._truncate_caption(caption or "")})
+                data.add_field(name, payload.data, filename=f"{name}.{payload.extension}", content_type=payload.mime_type)
+            data.add_field("media", json.dumps(media))
+
+            result = await self._make_request('post', 'sendMediaGroup', data=data)
+            if result:
+                print(f"{len(items)} photos sent successfully to Telegram")
+            return result
+        except Exception as e:
+            print(f"Error sending media group: {str(e)}")
+            return None
+
     async def send_message(self, text: str, title: Optional[str] = None) -> None:
         try:
             message_text = text
@@ -122,4 +162,4 @@ async def main():
         await sender.close_session()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    http_client.run(main())
\ No newline at end of file
@@ -1,8 +1,7 @@
 try:
     from together import Together
     import base64
-    from io import BytesIO
-    from PIL import Image
+    from utils.image_payload import ImagePayload
 except ModuleNotFoundError:
     raise ImportError("The required packages are not installed. Please install them using 'pip install together-ai pillow'")
 
@@ -25,11 +24,13 @@ class ImageGenerator:
         self.n = n
         self.response_format = response_format
 
-    def generate_image(self, prompt):
+    def generate_image(self, prompt, model_name=None, style=None):
         """
         Generates an image based on the given prompt.
         :param prompt: The text prompt for generating the image.
-        :return: A list of PIL Image objects.
+        :param model_name: Ignored; Pollinations model names do not exist on Together, self.model is used.
+        :param style: Style name, accepted for interface compatibility with the other generators.
+        :return: ImagePayload of the first generated image, or None.
         """
         if not prompt:
             raise ValueError("Prompt cannot be empty")
@@ -45,12 +46,7 @@ class ImageGenerator:
         )
         
         if response and response.data:
-            images = []
-            for img_data in response.data:
-                image_bytes = base64.b64decode(img_data.b64_json)
-                image = Image.open(BytesIO(image_bytes))
-                images.append(image)
-            return images
+            return ImagePayload.from_bytes(base64.b64decode(response.data[0].b64_json))
         return None
 
 # Example usage
@@ -58,10 +54,9 @@ if __name__ == "__main__":
     generator = ImageGenerator()
     prompt = "A futuristic city with flying cars and neon lights"
     try:
-        images = generator.generate_image(prompt)
-        if images:
-            images[0].show()  # Display the first image
-            print("Image OK")
+        image = generator.generate_image(prompt)
+        if image:
+            print(f"Image OK - {image.mime_type} {image.width}x{image.height}")
         else:
             print("No image generated.")
     except Exception as e:
@@ -0,0 +1,122 @@
+import os
+import re
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Re-check file mtimes on every access; meant for editing CSS/HTML with the app running
+DEV_MODE = os.getenv("ASSETS_DEV_MODE", "0").lower() in ("1", "true", "yes")
+
+_CSS_STRING = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_STYLE_BLOCK = re.compile(r"(<style[^>]*>)(.*?)(</style>)", re.S | re.I)
+_HTML_COMMENT = re.compile(r"<!--.*?-->", re.S)
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and redundant whitespace; string literals (content: " ▼") are left alone"""
+    parts = _CSS_STRING.split(_CSS_COMMENT.sub("", css))
+    for i in range(0, len(parts), 2):
+        code = re.sub(r"\s+", " ", parts[i])
+        code = re.sub(r"\s*([{};,>])\s*", r"\1", code)
+        parts[i] = code.replace(": ", ":").replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def minify_html(html: str) -> str:
+    """
+    Minify embedded <style> blocks, drop comments and indentation. Line breaks stay:
+    st.markdown parses the fragment as Markdown, where blank lines are significant.
+    """
+    html = _HTML_COMMENT.sub("", html)
+    html = _STYLE_BLOCK.sub(lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), html)
+    return "\n".join(line.strip() for line in html.splitlines()).strip()
+
+
+_MINIFIERS: Dict[str, Callable[[str], str]] = {
+    ".css": minify_css,
+    ".html": minify_html,
+}
+
+
+class Asset:
+    """One static file, minified, with a content fingerprint"""
+    __slots__ = ("path", "text", "fingerprint", "mtime", "raw_size")
+
+    def __init__(self, path: str, text: str, mtime: float, raw_size: int):
+        self.path = path
+        self.text = text
+        self.fingerprint = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        self.mtime = mtime
+        self.raw_size = raw_size
+
+
+class AssetBundle:
+    """
+    Static files (CSS, HTML, Markdown) read and minified once per process. Fragments rendered
+    from them are cached per fingerprint, so a rerun costs a dict lookup instead of file I/O.
+    In dev mode a changed mtime reloads the file.
+    """
+
+    def __init__(self, root: Optional[str] = None, dev_mode: bool = DEV_MODE):
+        self.root = root or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.dev_mode = dev_mode
+        self._assets: Dict[str, Asset] = {}
+        self._fragments: Dict[Tuple[str, str], Tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self, path: str) -> Asset:
+        full_path = os.path.join(self.root, path)
+        mtime = os.path.getmtime(full_path)
+        with open(full_path, "r", encoding="utf-8") as f:
+            raw = f.read()
+        minifier = _MINIFIERS.get(os.path.splitext(path)[1].lower())
+        text = minifier(raw) if minifier else raw
+        self.loads += 1
+        return Asset(path, text, mtime, len(raw.encode("utf-8")))
+
+    def get(self, path: str) -> Asset:
+        """path is relative to the project root; raises FileNotFoundError for a missing file"""
+        asset = self._assets.get(path)
+        if asset is not None:
+            if not self.dev_mode or os.path.getmtime(os.path.join(self.root, path)) == asset.mtime:
+                return asset
+        with self._lock:
+            asset = self._load(path)
+            self._assets[path] = asset
+        return asset
+
+    def fragment(self, path: str, render: Callable[[Asset], Any], key: str = "") -> Any:
+        """render(asset), computed once per asset version; key tells apart renderers of the same file"""
+        asset = self.get(path)
+        cached = self._fragments.get((path, key))
+        if cached is not None and cached[0] == asset.fingerprint:
+            return cached[1]
+        value = render(asset)
+        self._fragments[(path, key)] = (asset.fingerprint, value)
+        return value
+
+    def css(self, path: str) -> str:
+        """A stylesheet as a <style> block for st.markdown(..., unsafe_allow_html=True)"""
+        return self.fragment(path, lambda asset: f"<style>{asset.text}</style>", key="css")
+
+    def text(self, path: str) -> str:
+        """HTML or Markdown content, minified where that is safe"""
+        return self.get(path).text
+
+    def stats(self) -> dict:
+        return {
+            "assets": len(self._assets),
+            "loads": self.loads,
+            "bytes": sum(len(a.text.encode("utf-8")) for a in self._assets.values()),
+            "raw_bytes": sum(a.raw_size for a in self._assets.values()),
+            "fingerprints": {a.path: a.fingerprint for a in self._assets.values()},
+        }
+
+
+assets = AssetBundle()
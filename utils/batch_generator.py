@@ -0,0 +1,60 @@
+import os
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from utils.image_payload import ImagePayload
+from utils.style_catalog import Style
+from utils import http_client
+
+# Load environment variables
+load_dotenv()
+
+MAX_WORKERS = int(os.getenv("GENERATION_MAX_WORKERS", "4"))
+
+_slots = None
+
+
+def _generation_slots() -> asyncio.Semaphore:
+    """Shared by all sessions; its size is the per-server generation budget. Only used on the shared loop."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MAX_WORKERS)
+    return _slots
+
+
+class BatchGenerator:
+    """Render one prompt in several styles concurrently"""
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    @http_client.shared_loop
+    async def _generate(self, prompt: str, style: Style) -> Optional[ImagePayload]:
+        async with _generation_slots():
+            return await self.generator.generate_image_async(
+                style.full_prompt(prompt),
+                style.model,
+                style=style.name,
+            )
+
+    async def generate_styles_async(self, prompt: str, styles: List[Style]) -> AsyncIterator[Tuple[Style, Optional[ImagePayload]]]:
+        """
+        Yield (style, image) pairs in completion order, so callers can show each result
+        as soon as it is ready; image is None when that style failed. At most
+        GENERATION_MAX_WORKERS styles generate at once across all sessions.
+        Leaving the loop early (or cancelling the caller) cancels the styles still running.
+        """
+        async def _one(style):
+            try:
+                return style, await self._generate(prompt, style)
+            except Exception as e:
+                print(f"Error generating style {style.name}: {str(e)}")
+                return style, None
+
+        tasks = [asyncio.ensure_future(_one(style)) for style in styles]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,70 @@
+import re
+import time
+import threading
+from typing import Iterator, Optional
+from utils import tracing
+
+_SENTENCE_END = re.compile(r"[.!?](\s|$)")
+
+
+def clean_text(text):
+    """Clean text from HTML tags and normalize line breaks"""
+    if not text:
+        return ""
+    # Replace HTML line breaks with spaces
+    text = text.replace('<br>', ' ').replace('<br/>', ' ').replace('<br />', ' ')
+    # Replace multiple spaces with single space
+    text = ' '.join(text.split())
+    return text
+
+
+class CaptionStream:
+    """
+    Consumes a caption generator on a background thread so pages can render
+    partial text and move on before the description is complete.
+    """
+
+    def __init__(self, deltas: Iterator[str]):
+        self._deltas = deltas
+        self._parts = []
+        self._lock = threading.Lock()
+        self._first_sentence = threading.Event()
+        self._finished = threading.Event()
+        self.error: Optional[Exception] = None
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=tracing.bind(self._run), daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with tracing.span("caption", streamed=True) as caption_span:
+            try:
+                for delta in self._deltas:
+                    with self._lock:
+                        self._parts.append(delta)
+                        text = "".join(self._parts)
+                    if not self._first_sentence.is_set() and _SENTENCE_END.search(text):
+                        self._first_sentence.set()
+                        caption_span.set(first_sentence_ms=round((time.perf_counter() - self._started) * 1000, 3))
+            except Exception as e:
+                print(f"Error streaming caption: {str(e)}")
+                self.error = e
+                caption_span.error = repr(e)
+            finally:
+                self._first_sentence.set()
+                self._finished.set()
+                caption_span.set(chars=len(self.text))
+
+    @property
+    def text(self) -> str:
+        with self._lock:
+            return "".join(self._parts)
+
+    @property
+    def done(self) -> bool:
+        return self._finished.is_set()
+
+    def wait_for_first_sentence(self, timeout: Optional[float] = None) -> bool:
+        return self._first_sentence.wait(timeout)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
@@ -0,0 +1,284 @@
+import os
+import time
+import asyncio
+import queue
+import base64
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from io import BytesIO
+from typing import Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from utils import http_client
+from utils import tracing
+
+# Load environment variables
+load_dotenv()
+
+_DONE = object()
+
+
+class StubCaptioner:
+    """Offline captioner with the GroqImageCaptioner interface, for development and tests"""
+
+    def __init__(self, description: str = "A photo."):
+        self.description = description
+
+    def process_bytesio_image(self, image_bytes: BytesIO, format: str = "PNG") -> tuple[str, str]:
+        encoded_image = base64.b64encode(image_bytes.getvalue()).decode()
+        return f"data:image/{format.lower()};base64,{encoded_image}", self.description
+
+    @http_client.shared_loop
+    async def process_bytesio_image_async(self, image_bytes: BytesIO, format: str = "PNG") -> tuple[str, str]:
+        return self.process_bytesio_image(image_bytes, format)
+
+    def stream_bytesio_image(self, image_bytes: BytesIO, format: str = "PNG") -> Iterator[str]:
+        yield self.description
+
+    def describe_image(self, image_url: str) -> str:
+        return self.description
+
+
+class BackendStats:
+    """Rolling latency and error rate for one backend"""
+
+    def __init__(self, window: int = 50):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: Optional[float], ok: bool):
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok and latency is not None:
+                self._latencies.append(latency)
+
+    def p90(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < 5:
+                return None
+            ordered = sorted(self._latencies)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self._outcomes)
+
+
+class CaptionerRouter:
+    """
+    Routes captioning across several backends with the GroqImageCaptioner interface.
+    Backends are tried in configured order, skipping ones with a high recent error rate.
+    If the chosen backend has not answered within its own p90 latency, the request is
+    hedged to the next backend and whichever answers first wins. Streaming hedges on the
+    p90 time to first token instead. Cache hits count towards the error rate only.
+    """
+
+    def __init__(self, backends: List[Tuple[str, object]], hedge_delay: float = None,
+                 max_error_rate: float = None):
+        if not backends:
+            raise ValueError("CaptionerRouter needs at least one backend")
+        self.backends = backends
+        # Total latency and outcome per backend; time to first token for streaming
+        self.stats = {name: BackendStats() for name, _ in backends}
+        self.first_token = {name: BackendStats() for name, _ in backends}
+        self.default_hedge_delay = hedge_delay or float(os.getenv("CAPTION_HEDGE_DELAY", "8"))
+        self.max_error_rate = max_error_rate if max_error_rate is not None else float(os.getenv("CAPTION_MAX_ERROR_RATE", "0.5"))
+        self.executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="caption")
+
+    def _ordered(self) -> List[Tuple[str, object]]:
+        healthy = [
+            backend for backend in self.backends
+            if self.stats[backend[0]].samples() < 5 or self.stats[backend[0]].error_rate() <= self.max_error_rate
+        ]
+        # If everything looks unhealthy, still try them all in order
+        return healthy + [backend for backend in self.backends if backend not in healthy]
+
+    def _hedge_delay(self, name: str, streaming: bool = False) -> float:
+        p90 = (self.first_token if streaming else self.stats)[name].p90()
+        return max(0.5, p90) if p90 is not None else self.default_hedge_delay
+
+    @staticmethod
+    def _latency(current: tracing.Span, start: float) -> Optional[float]:
+        """Elapsed time, or None for a cache hit, which says nothing about the backend's speed"""
+        return None if current.attributes.get("cache_hit") else time.monotonic() - start
+
+    def _timed_process(self, name, backend, data: bytes, format: str):
+        start = time.monotonic()
+        with tracing.span(f"caption.{name}") as current:
+            try:
+                image_url, description = backend.process_bytesio_image(BytesIO(data), format)
+            except Exception as e:
+                print(f"Captioner {name} failed: {str(e)}")
+                image_url, description = None, None
+        self.stats[name].record(self._latency(current, start), bool(description))
+        return image_url, description
+
+    def process_bytesio_image(self, image_bytes: BytesIO, format: str = "PNG") -> tuple[str, str]:
+        data = image_bytes.getvalue()
+        ordered = self._ordered()
+        pending = {}
+        next_backend = 0
+
+        def launch():
+            nonlocal next_backend
+            name, backend = ordered[next_backend]
+            next_backend += 1
+            pending[self.executor.submit(tracing.bind(self._timed_process), name, backend, data, format)] = name
+
+        launch()
+        while pending:
+            timeout = self._hedge_delay(pending[next(iter(pending))]) if next_backend < len(ordered) else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()  # hedge: primary is slower than usual
+                continue
+            for future in done:
+                pending.pop(future)
+                image_url, description = future.result()
+                if description:
+                    return image_url, description
+            if next_backend < len(ordered):
+                launch()  # failed outright: go straight to the next backend
+        return None, None
+
+    async def _timed_process_async(self, name, backend, data: bytes, format: str):
+        start = time.monotonic()
+        with tracing.span(f"caption.{name}") as current:
+            try:
+                if hasattr(backend, "process_bytesio_image_async"):
+                    image_url, description = await backend.process_bytesio_image_async(BytesIO(data), format)
+                else:
+                    image_url, description = await asyncio.to_thread(
+                        tracing.bind(backend.process_bytesio_image), BytesIO(data), format)
+            except Exception as e:
+                print(f"Captioner {name} failed: {str(e)}")
+                image_url, description = None, None
+        self.stats[name].record(self._latency(current, start), bool(description))
+        return image_url, description
+
+    async def process_bytesio_image_async(self, image_bytes: BytesIO, format: str = "PNG") -> tuple[str, str]:
+        """Async process_bytesio_image: same hedging, and the losing request is cancelled"""
+        data = image_bytes.getvalue()
+        ordered = self._ordered()
+        pending = {}
+        next_backend = 0
+
+        def launch():
+            nonlocal next_backend
+            name, backend = ordered[next_backend]
+            next_backend += 1
+            pending[asyncio.ensure_future(self._timed_process_async(name, backend, data, format))] = name
+
+        launch()
+        try:
+            while pending:
+                timeout = self._hedge_delay(pending[next(iter(pending))]) if next_backend < len(ordered) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    image_url, description = task.result()
+                    if description:
+                        return image_url, description
+                if next_backend < len(ordered):
+                    launch()
+            return None, None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _pump(self, name, backend, data: bytes, format: str, deltas: queue.Queue, stop: threading.Event):
+        start = time.monotonic()
+        first = True
+        try:
+            with tracing.span(f"caption.{name}", streaming=True) as current:
+                for delta in backend.stream_bytesio_image(BytesIO(data), format):
+                    if first:
+                        # Recorded even for a hedging loser, so its p90 reflects how slow it was
+                        self.first_token[name].record(self._latency(current, start), True)
+                        first = False
+                    if stop.is_set():
+                        return
+                    deltas.put((name, delta))
+            self.stats[name].record(self._latency(current, start), not first)
+        except Exception as e:
+            print(f"Captioner {name} failed: {str(e)}")
+            self.stats[name].record(None, False)
+            deltas.put((name, e))
+        finally:
+            deltas.put((name, _DONE))
+
+    def stream_bytesio_image(self, image_bytes: BytesIO, format: str = "PNG") -> Iterator[str]:
+        """Hedge on time to first token; stream the rest from the backend that answered first"""
+        data = image_bytes.getvalue()
+        ordered = self._ordered()
+        deltas = queue.Queue()
+        stops = {}
+        next_backend = 0
+        running = set()
+
+        def launch():
+            nonlocal next_backend
+            name, backend = ordered[next_backend]
+            next_backend += 1
+            stops[name] = threading.Event()
+            running.add(name)
+            threading.Thread(
+                target=tracing.bind(self._pump), args=(name, backend, data, format, deltas, stops[name]), daemon=True
+            ).start()
+
+        launch()
+        winner = None
+        while winner is None:
+            if not running:
+                if next_backend >= len(ordered):
+                    return
+                launch()
+            timeout = self._hedge_delay(ordered[next_backend - 1][0], streaming=True) if next_backend < len(ordered) else None
+            try:
+                name, delta = deltas.get(timeout=timeout)
+            except queue.Empty:
+                launch()
+                continue
+            if delta is _DONE or isinstance(delta, Exception):
+                running.discard(name)
+                continue
+            winner = name
+            for other, stop in stops.items():
+                if other != winner:
+                    stop.set()
+            yield delta
+
+        while True:
+            name, delta = deltas.get()
+            if name != winner:
+                continue
+            if delta is _DONE:
+                return
+            if isinstance(delta, Exception):
+                raise delta
+            yield delta
+
+    def describe_image(self, image_url: str) -> str:
+        for name, backend in self._ordered():
+            try:
+                return backend.describe_image(image_url)
+            except Exception as e:
+                print(f"Captioner {name} failed: {str(e)}")
+        return "Could not generate description"
+
+    def backend_stats(self) -> dict:
+        return {
+            name: {"p90": stats.p90(), "first_token_p90": self.first_token[name].p90(),
+                   "error_rate": stats.error_rate(), "samples": stats.samples()}
+            for name, stats in self.stats.items()
+        }
@@ -1,16 +1,21 @@
 import os
 import streamlit as st
 from dotenv import load_dotenv
+from utils.registry import get_counter_store
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Retrieve the COUNTER value from the .env file
+USERS = "users"
+LAST_DATETIME_USE = "last_datetime_use"
+
+# Counts live in the shared counter store (SQLite by default, Redis with COUNTER_STORE=redis).
+# COUNTER in .env only seeds a fresh store.
 def get_user_count(formatted=False):
-    count = os.getenv('COUNTER', '0')
     try:
-        count = int(count)
-    except ValueError:
+        count = get_counter_store().get(USERS)
+    except Exception as e:
+        print(f"Error reading user count: {str(e)}")
         count = 0
     
     if formatted:
@@ -19,14 +24,37 @@ def get_user_count(formatted=False):
     return count
 
 def increment_user_count():
-    count = get_user_count() + 1
-    os.environ['COUNTER'] = str(count)  # This will only update the current session.
-    return count
+    # Buffered: the increment reaches the store in the background
+    try:
+        return get_counter_store().incr(USERS)
+    except Exception as e:
+        print(f"Error incrementing user count: {str(e)}")
+        return 0
 
 def decrement_user_count():
-    count = max(0, get_user_count() - 1)
-    os.environ['COUNTER'] = str(count)  # This will only update the current session.
-    return count
+    try:
+        store = get_counter_store()
+        if store.get(USERS) <= 0:
+            return 0
+        return store.incr(USERS, -1)
+    except Exception as e:
+        print(f"Error decrementing user count: {str(e)}")
+        return 0
+
+def get_last_datetime_use():
+    """Time of the latest visit; falls back to LAST_DATETIME_USE from .env on a fresh store"""
+    try:
+        value = get_counter_store().get_value(LAST_DATETIME_USE)
+    except Exception as e:
+        print(f"Error reading last visit time: {str(e)}")
+        value = None
+    return value or os.getenv("LAST_DATETIME_USE")
+
+def set_last_datetime_use(value):
+    try:
+        get_counter_store().set_value(LAST_DATETIME_USE, value)
+    except Exception as e:
+        print(f"Error saving last visit time: {str(e)}")
 
 def format_count(count):
     """Format the count with commas and round to nearest thousand if over 1000"""    
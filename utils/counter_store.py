@@ -0,0 +1,341 @@
+import os
+import socket
+import sqlite3
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+class SqliteCounterStore:
+    """Counters and small string values in a SQLite WAL database; increments are single atomic statements"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("COUNTER_DB_PATH", os.path.join("data", "counters.sqlite3"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS vars (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount),
+            )
+            return self._db.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+
+    def get(self, name: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def seed(self, name: str, value: int):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO NOTHING", (name, value)
+            )
+
+    def set_value(self, name: str, value: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO vars (name, value) VALUES (?, ?)", (name, value))
+
+    def get_value(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM vars WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RedisError(Exception):
+    """Error reply from the server"""
+
+
+class RedisCounterStore:
+    """
+    The same store on anything that speaks the Redis protocol (Redis, Valkey, KeyDB or a local
+    stand-in), so replicas share one count. Uses INCRBY/GET/SET only; no client library needed.
+    Nothing connects until the first command, so building the store never blocks.
+    """
+
+    def __init__(self, url: Optional[str] = None, prefix: Optional[str] = None, timeout: float = 2.0):
+        parsed = urlparse(url or os.getenv("COUNTER_REDIS_URL", "redis://localhost:6379/0"))
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix if prefix is not None else os.getenv("COUNTER_REDIS_PREFIX", "photo-to-photo:")
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _disconnect(self):
+        for closable in (self._reader, self._sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    def _send(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)[:-2]
+            return data.decode("utf-8")
+        if kind == b"*":
+            return [self._read_reply() for _ in range(int(payload))]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _command(self, *args):
+        with self._lock:
+            # One reconnect: the server may have dropped an idle connection
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(*args)
+                except (OSError, ConnectionError):
+                    self._disconnect()
+                    if attempt:
+                        raise
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        return self._command("INCRBY", self.prefix + name, amount)
+
+    def get(self, name: str) -> Optional[int]:
+        value = self._command("GET", self.prefix + name)
+        return int(value) if value is not None else None
+
+    def seed(self, name: str, value: int):
+        # NX: only the first replica to seed a fresh store wins
+        self._command("SET", self.prefix + name, value, "NX")
+
+    def set_value(self, name: str, value: str):
+        self._command("SET", self.prefix + name, value)
+
+    def get_value(self, name: str) -> Optional[str]:
+        return self._command("GET", self.prefix + name)
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+class MemoryCounterStore:
+    """Per-process fallback when the configured store cannot be opened; counts reset on restart"""
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._values: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+            return self._counts[name]
+
+    def get(self, name: str) -> Optional[int]:
+        return self._counts.get(name)
+
+    def seed(self, name: str, value: int):
+        with self._lock:
+            self._counts.setdefault(name, value)
+
+    def set_value(self, name: str, value: str):
+        self._values[name] = value
+
+    def get_value(self, name: str) -> Optional[str]:
+        return self._values.get(name)
+
+    def close(self):
+        pass
+
+
+class WriteBehindCounterStore:
+    """
+    Front for a slow store: increments and value writes are buffered and flushed by a
+    background thread, and reads come from memory. A page render never waits on the store,
+    except for the first read of a name. While the store is down, writes stay buffered
+    and are retried on every flush.
+    """
+
+    def __init__(self, store, flush_interval: Optional[float] = None):
+        self.store = store
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("COUNTER_FLUSH_SECONDS", "2"))
+        self._pending: Dict[str, int] = {}
+        self._pending_values: Dict[str, str] = {}
+        self._seeds: Dict[str, int] = {}
+        self._counts: Dict[str, int] = {}
+        self._values: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+        self._thread.start()
+
+    def _load_count(self, name: str) -> int:
+        if name not in self._counts:
+            try:
+                value = self.store.get(name)
+            except Exception as e:
+                print(f"Error reading counter {name}: {str(e)}")
+                value = None
+            with self._lock:
+                self._counts.setdefault(name, value if value is not None else self._seeds.get(name, 0))
+        return self._counts[name]
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        self._load_count(name)
+        with self._lock:
+            self._pending[name] = self._pending.get(name, 0) + amount
+            return self._counts[name] + self._pending[name]
+
+    def get(self, name: str) -> int:
+        self._load_count(name)
+        with self._lock:
+            return self._counts[name] + self._pending.get(name, 0)
+
+    def set_value(self, name: str, value: str):
+        with self._lock:
+            self._values[name] = value
+            self._pending_values[name] = value
+
+    def seed(self, name: str, value: int):
+        """
+        Starting value for a counter the store has never seen, e.g. one migrated from .env.
+        Written by the flush thread, before any increment, and only if the name is absent.
+        """
+        if value:
+            with self._lock:
+                self._seeds[name] = value
+            self._wake.set()
+
+    def get_value(self, name: str) -> Optional[str]:
+        if name not in self._values:
+            try:
+                value = self.store.get_value(name)
+            except Exception as e:
+                print(f"Error reading value {name}: {str(e)}")
+                value = None
+            with self._lock:
+                self._values.setdefault(name, value)
+        return self._values[name]
+
+    def flush(self):
+        # Writes leave the buffer only once the store has them, so a reader never sees
+        # a total that is missing an increment that is in flight
+        with self._lock:
+            seeds = dict(self._seeds)
+            pending = dict(self._pending)
+            pending_values = dict(self._pending_values)
+        for name, value in seeds.items():
+            try:
+                self.store.seed(name, value)
+            except Exception as e:
+                print(f"Error seeding counter {name}: {str(e)}")
+                # Increments wait for the seed, or they would make the name exist without it
+                pending.pop(name, None)
+                continue
+            with self._lock:
+                self._seeds.pop(name, None)
+        for name, amount in pending.items():
+            try:
+                total = self.store.incr(name, amount)
+            except Exception as e:
+                print(f"Error flushing counter {name}: {str(e)}")
+                continue
+            with self._lock:
+                # The store's total also includes other processes' increments
+                self._counts[name] = total
+                left = self._pending.get(name, 0) - amount
+                if left:
+                    self._pending[name] = left
+                else:
+                    self._pending.pop(name, None)
+        for name, value in pending_values.items():
+            try:
+                self.store.set_value(name, value)
+            except Exception as e:
+                print(f"Error flushing value {name}: {str(e)}")
+                continue
+            with self._lock:
+                if self._pending_values.get(name) == value:
+                    del self._pending_values[name]
+        # Pick up increments made by other processes or replicas
+        for name in [name for name in list(self._counts) if name not in pending]:
+            try:
+                total = self.store.get(name)
+            except Exception:
+                continue
+            if total is not None:
+                with self._lock:
+                    if name not in self._seeds:
+                        self._counts[name] = total
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        self.store.close()
+
+
+def build_counter_store() -> WriteBehindCounterStore:
+    """
+    COUNTER_STORE=sqlite (default) or redis, behind the write-behind buffer. If the
+    store cannot be opened the counts are kept in memory instead of failing the page.
+    """
+    backend = os.getenv("COUNTER_STORE", "sqlite").lower()
+    try:
+        store = RedisCounterStore() if backend == "redis" else SqliteCounterStore()
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"Counter store {backend} is unavailable, counting in memory: {str(e)}")
+        store = MemoryCounterStore()
+    return WriteBehindCounterStore(store)
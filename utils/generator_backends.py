@@ -0,0 +1,169 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Protocol, Tuple
+from dotenv import load_dotenv
+from utils.image_payload import ImagePayload
+from utils.retry import CircuitBreaker
+from utils import http_client
+from utils import tracing
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ImageBackend(Protocol):
+    """What every generator (Pollinations, Together, Unsplash) implements"""
+
+    def generate_image(self, prompt: str, model_name: str = "flux",
+                       style: Optional[str] = None) -> Optional[ImagePayload]:
+        ...
+
+
+class GeneratorDispatcher:
+    """
+    One generate_image() in front of several backends. The style picks the backend;
+    each backend has a concurrency limit and a circuit breaker, and a request fails
+    over to the next backend when its own is saturated, open or fails.
+    """
+
+    def __init__(self, backends: List[Tuple[str, ImageBackend]], styles=None,
+                 max_concurrency: Optional[int] = None, acquire_timeout: Optional[float] = None):
+        if not backends:
+            raise ValueError("GeneratorDispatcher needs at least one backend")
+        self.backends = dict(backends)
+        self.order = [name for name, _ in backends]
+        # StyleCatalog (or anything with backend_for(style)); it follows edits to the styles file.
+        # May be a zero-argument callable returning one, resolved per request, so a broken styles
+        # file only disables per-style routing instead of generation
+        self.styles = styles
+        limit = max_concurrency or int(os.getenv("GENERATION_BACKEND_CONCURRENCY", "4"))
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else float(os.getenv("GENERATION_ACQUIRE_TIMEOUT", "10"))
+        self.semaphores = {name: threading.BoundedSemaphore(limit) for name in self.order}
+        self.breakers = {
+            name: CircuitBreaker(
+                max_error_rate=float(os.getenv("GENERATION_MAX_ERROR_RATE", "0.5")),
+                reset_timeout=float(os.getenv("GENERATION_BREAKER_RESET_SECONDS", "30")),
+            )
+            for name in self.order
+        }
+        self._in_flight = {name: 0 for name in self.order}
+        self._lock = threading.Lock()
+
+    def _backend_for(self, style: Optional[str]) -> Optional[str]:
+        styles = self.styles
+        try:
+            if callable(styles):
+                styles = styles()
+            return styles.backend_for(style) if styles is not None else None
+        except Exception as e:
+            logger.warning(f"Style routing unavailable, using {self.order[0]}: {e}")
+            return None
+
+    def _candidates(self, style: Optional[str]) -> List[str]:
+        primary = self._backend_for(style) or self.order[0]
+        if primary not in self.backends:
+            logger.warning(f"Unknown backend {primary} for style {style}, using {self.order[0]}")
+            primary = self.order[0]
+        return [primary] + [name for name in self.order if name != primary]
+
+    def _call(self, name: str, prompt: str, model_name: str, style: Optional[str]) -> Optional[ImagePayload]:
+        semaphore = self.semaphores[name]
+        if not semaphore.acquire(timeout=self.acquire_timeout):
+            self.breakers[name].release()
+            logger.warning(f"Generator {name} is saturated, failing over")
+            return None
+        with self._lock:
+            self._in_flight[name] += 1
+        try:
+            with tracing.span(f"generate.{name}"):
+                image = self.backends[name].generate_image(prompt, model_name, style=style)
+        except Exception as e:
+            logger.error(f"Generator {name} failed: {e}")
+            image = None
+        finally:
+            with self._lock:
+                self._in_flight[name] -= 1
+            semaphore.release()
+        self.breakers[name].record(image is not None)
+        return image
+
+    def generate_image(self, prompt: str, model_name: str = "flux", style: Optional[str] = None) -> Optional[ImagePayload]:
+        with tracing.span("generate", style=style, model=model_name) as generate_span:
+            for name in self._candidates(style):
+                if not self.breakers[name].allow():
+                    logger.info(f"Generator {name} circuit is open, skipping")
+                    continue
+                image = self._call(name, prompt, model_name, style)
+                if image is not None:
+                    generate_span.set(backend=name)
+                    return image
+            logger.error("All image generation backends failed or are unavailable")
+            generate_span.error = "all backends failed"
+            return None
+
+    async def _acquire_async(self, semaphore: threading.BoundedSemaphore) -> bool:
+        # Poll instead of a blocking acquire in a thread, so cancellation never leaks a slot
+        deadline = time.monotonic() + self.acquire_timeout
+        while not semaphore.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def _call_async(self, name: str, prompt: str, model_name: str, style: Optional[str]) -> Optional[ImagePayload]:
+        semaphore = self.semaphores[name]
+        if not await self._acquire_async(semaphore):
+            self.breakers[name].release()
+            logger.warning(f"Generator {name} is saturated, failing over")
+            return None
+        with self._lock:
+            self._in_flight[name] += 1
+        backend = self.backends[name]
+        try:
+            with tracing.span(f"generate.{name}"):
+                if hasattr(backend, "generate_image_async"):
+                    image = await backend.generate_image_async(prompt, model_name, style=style)
+                else:
+                    image = await asyncio.to_thread(backend.generate_image, prompt, model_name, style=style)
+        except asyncio.CancelledError:
+            self.breakers[name].release()
+            raise
+        except Exception as e:
+            logger.error(f"Generator {name} failed: {e}")
+            image = None
+        finally:
+            with self._lock:
+                self._in_flight[name] -= 1
+            semaphore.release()
+        self.breakers[name].record(image is not None)
+        return image
+
+    @http_client.shared_loop
+    async def generate_image_async(self, prompt: str, model_name: str = "flux",
+                                   style: Optional[str] = None) -> Optional[ImagePayload]:
+        """
+        generate_image for async callers, run on the shared loop so backend clients outlive
+        the rerun; backends without an async variant run in a thread
+        """
+        with tracing.span("generate", style=style, model=model_name) as generate_span:
+            for name in self._candidates(style):
+                if not self.breakers[name].allow():
+                    logger.info(f"Generator {name} circuit is open, skipping")
+                    continue
+                image = await self._call_async(name, prompt, model_name, style)
+                if image is not None:
+                    generate_span.set(backend=name)
+                    return image
+            logger.error("All image generation backends failed or are unavailable")
+            generate_span.error = "all backends failed"
+            return None
+
+    def backend_stats(self) -> dict:
+        with self._lock:
+            in_flight = dict(self._in_flight)
+        return {name: {"state": self.breakers[name].state, "in_flight": in_flight[name]} for name in self.order}
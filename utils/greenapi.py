@@ -83,12 +83,15 @@
 #     print(f"Message sent: {result}")
 #########################
 
-import requests
 import os
 from dotenv import load_dotenv
 from typing import Optional
 import base64
 from io import BytesIO
+from utils import http_client
+from utils.image_payload import ImagePayload
+from utils.transcoder import transcode_payload
+from utils import tracing
 
 load_dotenv()
 
@@ -110,7 +113,21 @@ class WhatsAppSender:
             clean_number = '972' + clean_number
         return clean_number
 
-    def send_image_from_bytesio(self, phone: str, image_bytesio: BytesIO, caption: Optional[str] = None) -> bool:
+    @tracing.traced("whatsapp.send")
+    def send_image(self, phone: str, payload: ImagePayload, caption: Optional[str] = None) -> bool:
+        """Send an ImagePayload using file upload"""
+        # WhatsApp shows WEBP/GIF uploads as stickers or documents, not photos
+        try:
+            payload = transcode_payload(payload, "JPEG", accept=("image/png",))
+        except Exception as e:
+            print(f"Error converting image for WhatsApp, sending as is: {str(e)}")
+        return self.send_image_from_bytesio(
+            phone, payload.bytesio(), caption,
+            filename=f"image.{payload.extension}", content_type=payload.mime_type
+        )
+
+    def send_image_from_bytesio(self, phone: str, image_bytesio: BytesIO, caption: Optional[str] = None,
+                                filename: str = 'image.png', content_type: str = 'image/png') -> bool:
         """Send an image using file upload"""
         try:
             url = f"{self.base_url}/sendFileByUpload/{self.api_token}"
@@ -127,11 +144,11 @@ class WhatsAppSender:
             # Prepare file
             image_bytesio.seek(0)
             files = [
-                ('file', ('image.png', image_bytesio, 'image/png'))
+                ('file', (filename, image_bytesio, content_type))
             ]
             
             # Make request
-            response = requests.post(url, data=payload, files=files)
+            response = http_client.post(url, data=payload, files=files)
             response.raise_for_status()
             
             print(f"Response from API: {response.text}")
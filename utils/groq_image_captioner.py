@@ -1,15 +1,33 @@
 import base64
-from groq import Groq
+import asyncio
+from groq import Groq, AsyncGroq
 import os
+import threading
 from PIL import Image
 from io import BytesIO
+from typing import Iterator
 from dotenv import load_dotenv
+from utils.tiered_cache import TieredCache, make_key
+from utils.image_preprocessor import ImagePreprocessor
+from utils import http_client
+from utils import tracing
 
 # Load environment variables
 load_dotenv()
 
+_caption_cache = None
+_caption_cache_lock = threading.Lock()
+
+def get_caption_cache() -> TieredCache:
+    """Process-wide caption cache shared by all captioner instances"""
+    global _caption_cache
+    with _caption_cache_lock:
+        if _caption_cache is None:
+            _caption_cache = TieredCache("captions")
+    return _caption_cache
+
 class GroqImageCaptioner:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache=None, preprocessor=None):
         """Initialize the Groq client with API key and parameters from .env"""
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         if not self.api_key:
@@ -19,8 +37,11 @@ class GroqImageCaptioner:
         self.model = os.getenv("GROQ_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
         self.temperature = float(os.getenv("GROQ_TEMPERATURE", "0.7"))
         self.max_tokens = int(os.getenv("GROQ_MAX_TOKENS", "1024"))
+        self.timeout = float(os.getenv("GROQ_TIMEOUT", "60"))
         
         self.client = Groq(api_key=self.api_key)
+        self.cache = cache if cache is not None else get_caption_cache()
+        self.preprocessor = preprocessor or ImagePreprocessor()
         self.system_prompt = """You are describing an image to someone who is blind. Please be as detailed as possible.
 1. Start with the overall subject or theme of the image in simple terms.
 2. Describe the background: colors, patterns, or environmental details.
@@ -35,6 +56,38 @@ class GroqImageCaptioner:
         base64_image = base64.b64encode(image_bytes.read()).decode()
         return f"data:image/{format.lower()};base64,{base64_image}"
 
+    def _request_data_url(self, image_bytes: BytesIO, format: str = "PNG") -> str:
+        """Data URL sent to the model: normalized and size-budgeted, not the raw upload"""
+        try:
+            processed, processed_format = self.preprocessor.process(image_bytes.getvalue())
+            return self._image_to_data_url(BytesIO(processed), processed_format)
+        except Exception as e:
+            print(f"Image preprocessing failed, sending original: {str(e)}")
+            return self._image_to_data_url(image_bytes, format)
+
+    def _build_messages(self, image_url: str) -> list:
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"{self.system_prompt}\n\nDescribe the following image in detail:"
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
+                        }
+                    }
+                ]
+            }
+        ]
+
+    def _cache_key(self, image_bytes: BytesIO) -> str:
+        """Content-addressed key: image bytes plus everything that shapes the answer"""
+        return make_key(image_bytes.getbuffer(), self.model, self.temperature, self.system_prompt)
+
     def process_bytesio_image(self, image_bytes: BytesIO, format: str = "PNG") -> tuple[str, str]:
         """
         Process an image from BytesIO and return its data URI and description.
@@ -42,27 +95,18 @@ class GroqImageCaptioner:
         try:
             # Convert image to data URL
             image_data_url = self._image_to_data_url(image_bytes, format)
+
+            # Same bytes with the same settings were already described
+            cache_key = self._cache_key(image_bytes)
+            cached_description = self.cache.get(cache_key)
+            tracing.annotate(cache_hit=bool(cached_description))
+            if cached_description:
+                return image_data_url, cached_description
             
             # Create completion request
             completion = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": f"{self.system_prompt}\n\nDescribe the following image in detail:"
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": image_data_url
-                                }
-                            }
-                        ]
-                    }
-                ],
+                messages=self._build_messages(self._request_data_url(image_bytes, format)),
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
                 top_p=1,
@@ -71,6 +115,8 @@ class GroqImageCaptioner:
             
             # Get description from response
             description = completion.choices[0].message.content
+            if description:
+                self.cache.set(cache_key, description)
             
             # Return both the image data URL and description
             return image_data_url, description
@@ -79,6 +125,80 @@ class GroqImageCaptioner:
             print(f"Error processing image: {str(e)}")
             return None, None
 
+    def _async_client(self) -> AsyncGroq:
+        """AsyncGroq for the running event loop; its connections cannot outlive the loop"""
+        return http_client.get_loop_resource(f"groq-{id(self)}", lambda: AsyncGroq(api_key=self.api_key))
+
+    @http_client.shared_loop
+    async def process_bytesio_image_async(self, image_bytes: BytesIO, format: str = "PNG") -> tuple[str, str]:
+        """
+        Async process_bytesio_image, bounded by GROQ_TIMEOUT and cancellable. Runs on the
+        shared loop, so the AsyncGroq client is reused across reruns.
+        """
+        try:
+            image_data_url = self._image_to_data_url(image_bytes, format)
+
+            cache_key = self._cache_key(image_bytes)
+            cached_description = self.cache.get(cache_key)
+            tracing.annotate(cache_hit=bool(cached_description))
+            if cached_description:
+                return image_data_url, cached_description
+
+            # Resizing and re-encoding is CPU work; keep it off the event loop
+            request_url = await asyncio.to_thread(self._request_data_url, image_bytes, format)
+            async with asyncio.timeout(self.timeout):
+                completion = await self._async_client().chat.completions.create(
+                    model=self.model,
+                    messages=self._build_messages(request_url),
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    top_p=1,
+                    stream=False
+                )
+
+            description = completion.choices[0].message.content
+            if description:
+                self.cache.set(cache_key, description)
+            return image_data_url, description
+
+        except Exception as e:
+            print(f"Error processing image: {e!r}")
+            return None, None
+
+    def stream_bytesio_image(self, image_bytes: BytesIO, format: str = "PNG") -> Iterator[str]:
+        """
+        Describe an image from BytesIO, yielding the description as it is generated.
+        A cached description is yielded in one piece.
+        """
+        cache_key = self._cache_key(image_bytes)
+        cached_description = self.cache.get(cache_key)
+        tracing.annotate(cache_hit=bool(cached_description))
+        if cached_description:
+            yield cached_description
+            return
+
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(self._request_data_url(image_bytes, format)),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            top_p=1,
+            stream=True
+        )
+
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+
+        description = "".join(parts)
+        if description:
+            self.cache.set(cache_key, description)
+
     def describe_image(self, image_url: str) -> str:
         """
         Generate a description for an image from a URL.
@@ -86,23 +206,7 @@ class GroqImageCaptioner:
         try:
             completion = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": f"{self.system_prompt}\n\nDescribe the following image in detail:"
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": image_url
-                                }
-                            }
-                        ]
-                    }
-                ],
+                messages=self._build_messages(image_url),
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
                 top_p=1,
@@ -121,6 +225,7 @@ GROQ_API_KEY=your_api_key_here
 GROQ_MODEL=llama-3.2-11b-vision-preview
 GROQ_TEMPERATURE=0.7
 GROQ_MAX_TOKENS=1024
+GROQ_TIMEOUT=60
 """
 
 # Test functionality
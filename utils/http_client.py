@@ -0,0 +1,202 @@
+import os
+import asyncio
+import functools
+import threading
+import weakref
+from typing import TYPE_CHECKING, Callable, Optional
+from dotenv import load_dotenv
+
+# requests and aiohttp take ~250ms to import; pages import this module on every cold
+# start, so the clients are imported when the first session is built
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
+
+# Load environment variables
+load_dotenv()
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
+POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "10"))
+KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+
+_session = None
+_session_lock = threading.Lock()
+_async_sessions = weakref.WeakKeyDictionary()
+_loop_resources = weakref.WeakKeyDictionary()
+_async_factory: Optional[Callable] = None
+
+
+def default_timeout() -> tuple:
+    return (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+def _build_session() -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    # Retries are handled by the callers, the adapter only pools connections
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> "requests.Session":
+    """Process-wide keep-alive session shared by every sync caller"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def set_transport(session) -> None:
+    """Swap the shared sync session, e.g. for a local stub in tests. None restores the default."""
+    global _session
+    with _session_lock:
+        _session = session
+
+
+def request(method: str, url: str, **kwargs) -> "requests.Response":
+    kwargs.setdefault("timeout", default_timeout())
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    return request("POST", url, **kwargs)
+
+
+def _build_async_session() -> "aiohttp.ClientSession":
+    import aiohttp
+    connector = aiohttp.TCPConnector(
+        limit=POOL_HOSTS * POOL_PER_HOST,
+        limit_per_host=POOL_PER_HOST,
+        keepalive_timeout=KEEPALIVE_SECONDS,
+    )
+    timeout = aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def get_async_session() -> "aiohttp.ClientSession":
+    """
+    Pooled aiohttp session for the running event loop.
+    aiohttp sessions are bound to one loop, so each loop gets its own pool.
+    """
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        session = (_async_factory or _build_async_session)()
+        _async_sessions[loop] = session
+    return session
+
+
+def set_async_transport(factory: Optional[Callable]) -> None:
+    """Use factory() instead of a real aiohttp session (tests). None restores the default."""
+    global _async_factory
+    _async_factory = factory
+
+
+def get_loop_resource(name: str, factory: Callable):
+    """
+    Other loop-bound async clients (e.g. AsyncGroq) built once per event loop.
+    They are closed with the loop's session, so they need an async close().
+    """
+    resources = _loop_resources.setdefault(asyncio.get_running_loop(), {})
+    if name not in resources:
+        resources[name] = factory()
+    return resources[name]
+
+
+async def close_async_session() -> None:
+    """Close the pool and loop-bound clients that belong to the running loop"""
+    loop = asyncio.get_running_loop()
+    for name, resource in _loop_resources.pop(loop, {}).items():
+        try:
+            await resource.close()
+        except Exception as e:
+            print(f"Error closing {name}: {str(e)}")
+    session = _async_sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class LoopThread:
+    """
+    One event loop running on a daemon thread for the life of the process. Network calls
+    made from Streamlit reruns are moved onto it, so the aiohttp pool and loop-bound
+    clients (AsyncGroq) survive from one rerun to the next instead of being rebuilt.
+    """
+
+    def __init__(self, name: str = "shared-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        """Schedule coro on the loop; the caller's contextvars (trace id) come along"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self):
+        """Cancel what is still running, close the loop's clients, then stop the thread"""
+        async def _shutdown():
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+            await close_async_session()
+
+        try:
+            self.submit(_shutdown()).result(timeout=5)
+        except Exception as e:
+            print(f"Shared event loop did not shut down cleanly: {str(e)}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+def get_shared_loop() -> LoopThread:
+    from utils.registry import registry
+    return registry.get("event_loop")
+
+
+async def on_shared_loop(coro):
+    """
+    Await coro on the shared loop. Cancelling the caller cancels it there too; when the
+    caller already runs on the shared loop it is awaited directly.
+    """
+    shared = get_shared_loop()
+    if asyncio.get_running_loop() is shared.loop:
+        return await coro
+    return await asyncio.wrap_future(shared.submit(coro))
+
+
+def shared_loop(func):
+    """Decorator: run an async method on the shared loop, whichever loop awaits it"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await on_shared_loop(func(*args, **kwargs))
+    return wrapper
+
+
+def run(coro):
+    """asyncio.run that also closes the loop's pooled session before the loop goes away"""
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await close_async_session()
+    return asyncio.run(_main())
+
+
+def close() -> None:
+    """Release the shared sync pool"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
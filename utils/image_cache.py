@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+from utils.tiered_cache import make_key
+
+# Load environment variables
+load_dotenv()
+
+
+class GeneratedImageCache:
+    """
+    Generated images on disk (one file per request key) with an in-memory LRU index
+    and a total byte budget. Images are stored exactly as the API returned them,
+    which is already a compressed JPEG/WebP stream.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or os.path.join(os.getenv("CACHE_DIR", ".cache"), "generated")
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("GENERATED_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+        self._index = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._enabled = self._load_index()
+
+    @staticmethod
+    def make_key(prompt: str, style: Optional[str], model: str, seed, width: int, height: int) -> str:
+        """Key on the fully normalized request parameters"""
+        normalized_prompt = " ".join((prompt or "").split())
+        return make_key(normalized_prompt, style or "", model, seed, width, height)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.img")
+
+    def _load_index(self) -> bool:
+        """Rebuild the LRU order from file modification times"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".img"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._index[key] = size
+                self._total += size
+            return True
+        except OSError as e:
+            print(f"Generated image cache disabled: {str(e)}")
+            return False
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if not self._enabled or key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        try:
+            path = self._path(key)
+            with open(path, "rb") as f:
+                data = f.read()
+            # Persist recency so the LRU order survives a restart
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def set(self, key: str, data: bytes):
+        if not self._enabled or not data or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to cache generated image: {str(e)}")
+            return
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total += len(data)
+            evicted = []
+            while self._total > self.max_bytes and self._index:
+                old_key, size = self._index.popitem(last=False)
+                self._total -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespace": "generated",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._index),
+                "bytes": self._total,
+            }
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+def get_generated_image_cache() -> GeneratedImageCache:
+    """Process-wide generated image cache"""
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = GeneratedImageCache()
+    return _image_cache
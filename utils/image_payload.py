@@ -0,0 +1,91 @@
+import base64
+from io import BytesIO
+from typing import Optional
+from PIL import Image
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_mime_type(data) -> Optional[str]:
+    """Image mime type from the file signature"""
+    head = bytes(data[:12])
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ImagePayload:
+    """
+    An image as raw bytes plus its metadata. Pages and senders pass this around
+    instead of base64 data URIs; the data URI is only built if someone asks for it.
+    """
+    __slots__ = ("_data", "mime_type", "width", "height", "_data_uri")
+
+    def __init__(self, data: bytes, mime_type: Optional[str] = None,
+                 width: Optional[int] = None, height: Optional[int] = None):
+        self._data = bytes(data)
+        self.mime_type = mime_type or sniff_mime_type(self._data) or "image/jpeg"
+        self.width = width
+        self.height = height
+        self._data_uri = None
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ImagePayload":
+        """Build a payload, reading format and size from the image header only"""
+        with Image.open(BytesIO(data)) as img:
+            mime_type = Image.MIME.get(img.format) or sniff_mime_type(data)
+            width, height = img.size
+        return cls(data, mime_type, width, height)
+
+    @classmethod
+    def from_data_uri(cls, data_uri: str) -> "ImagePayload":
+        header, _, encoded = data_uri.partition(",")
+        mime_type = None
+        if header.startswith("data:") and ";" in header:
+            mime_type = header[5:header.index(";")]
+        return cls(base64.b64decode(encoded), mime_type)
+
+    @property
+    def data(self) -> bytes:
+        return self._data
+
+    @property
+    def view(self) -> memoryview:
+        """Zero-copy view of the image bytes"""
+        return memoryview(self._data)
+
+    @property
+    def format(self) -> str:
+        return self.mime_type.split("/")[-1]
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.format == "jpeg" else self.format
+
+    @property
+    def data_uri(self) -> str:
+        if self._data_uri is None:
+            self._data_uri = f"data:{self.mime_type};base64,{base64.b64encode(self._data).decode()}"
+        return self._data_uri
+
+    def bytesio(self) -> BytesIO:
+        # BytesIO shares the bytes buffer until it is written to
+        return BytesIO(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getstate__(self):
+        return (self._data, self.mime_type, self.width, self.height)
+
+    def __setstate__(self, state):
+        self._data, self.mime_type, self.width, self.height = state
+        self._data_uri = None
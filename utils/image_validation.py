@@ -0,0 +1,64 @@
+import os
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from dotenv import load_dotenv
+from utils.image_payload import ImagePayload
+from utils import tracing
+
+# Load environment variables
+load_dotenv()
+
+MIN_SIDE = int(os.getenv("GENERATED_IMAGE_MIN_SIDE", "100"))
+SAMPLE_SIDE = 64
+# JPEG noise on a flat image stays within a few levels
+SOLID_TOLERANCE = int(os.getenv("GENERATED_IMAGE_SOLID_TOLERANCE", "2"))
+
+
+class InvalidImageError(ValueError):
+    """The bytes are not an image we want to show"""
+
+
+def _sample_pixels(img: Image.Image) -> np.ndarray:
+    """A small grid of pixels covering the whole image, without decoding it at full size where avoidable"""
+    if img.format == "JPEG":
+        # libjpeg decodes straight to 1/8 scale: 1280x720 becomes 160x90
+        img.draft("RGB", (SAMPLE_SIDE, SAMPLE_SIDE))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    pixels = np.asarray(img)
+    # Formats without draft support: keep every n-th row and column
+    step = max(1, max(pixels.shape[:2]) // SAMPLE_SIDE)
+    return pixels[::step, ::step]
+
+
+def is_solid_color(pixels: np.ndarray, tolerance: int = SOLID_TOLERANCE) -> bool:
+    """True when every channel is flat, e.g. an all-black or all-white placeholder"""
+    spread = np.ptp(pixels.reshape(-1, pixels.shape[-1] if pixels.ndim == 3 else 1), axis=0)
+    return bool((spread <= tolerance).all())
+
+
+@tracing.traced("validate")
+def validate_image(data: bytes, min_side: int = MIN_SIDE) -> ImagePayload:
+    """
+    Check generated image bytes and wrap them in an ImagePayload.
+    Size and format come from the header; only a reduced sample is decoded for the solid-color check.
+    Raises InvalidImageError when the image is broken, too small or blank.
+    """
+    try:
+        with Image.open(BytesIO(data)) as img:
+            width, height = img.size
+            if width < min_side or height < min_side:
+                raise InvalidImageError(f"Image too small: {width}x{height}")
+            mime_type = Image.MIME.get(img.format)
+            # A truncated or corrupt file fails while decoding the sample
+            pixels = _sample_pixels(img)
+    except InvalidImageError:
+        raise
+    except Exception as e:
+        raise InvalidImageError(f"Not a readable image: {e}")
+
+    if is_solid_color(pixels):
+        raise InvalidImageError("Image is a single solid color")
+    return ImagePayload(data, mime_type, width, height)
+
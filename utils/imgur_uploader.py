@@ -4,8 +4,9 @@ import requests
 from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Literal, List, Tuple
 from dotenv import load_dotenv
-from PIL import Image
-from io import BytesIO
+from utils import http_client
+from utils.image_payload import sniff_mime_type
+from utils.transcoder import transcode
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,8 +17,8 @@ class ImgurUploader:
         if not self.imgur_client_id:
             raise ValueError("Imgur Client-ID not found. Please provide it or set it in the environment variables.")
         
-        self.session = requests.Session()
-        self.session.headers.update({'Authorization': f'Client-ID {self.imgur_client_id}'})
+        self.session = http_client.get_session()
+        self.headers = {'Authorization': f'Client-ID {self.imgur_client_id}'}
         self.max_retries = max_retries
         self.timeout = timeout
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
@@ -25,28 +26,8 @@ class ImgurUploader:
     def _convert_webp_to_jpeg(self, image_data: str) -> str:
         """Convert WebP image to JPEG format"""
         try:
-            # Decode base64 to bytes
-            image_bytes = base64.b64decode(image_data)
-            
-            # Open image with PIL
-            image = Image.open(BytesIO(image_bytes))
-            
-            # Convert to RGB (removes transparency)
-            if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                background.paste(image, mask=image.split()[3])
-                image = background
-            else:
-                image = image.convert('RGB')
-            
-            # Save as JPEG to BytesIO
-            output_buffer = BytesIO()
-            image.save(output_buffer, format='JPEG', quality=95)
-            
-            # Convert back to base64
-            return base64.b64encode(output_buffer.getvalue()).decode()
+            jpeg_bytes = transcode(base64.b64decode(image_data), "JPEG", quality=95)
+            return base64.b64encode(jpeg_bytes).decode()
         except Exception as e:
             print(f"Error converting WebP to JPEG: {e}")
             return image_data
@@ -62,9 +43,8 @@ class ImgurUploader:
         if media_type == "image":
             # Try to detect if it's a WebP image
             try:
-                image_bytes = base64.b64decode(media_base64)
-                img = Image.open(BytesIO(image_bytes))
-                if img.format == 'WEBP':
+                # The signature is in the first 12 bytes: decode only the first 16 base64 characters
+                if sniff_mime_type(base64.b64decode(media_base64[:16])) == "image/webp":
                     media_base64 = self._convert_webp_to_jpeg(media_base64)
             except Exception as e:
                 print(f"Error checking image format: {e}")
@@ -82,7 +62,7 @@ class ImgurUploader:
     def _execute_with_retry(self, url: str, payload: dict) -> str:
         for attempt in range(self.max_retries):
             try:
-                response = self.session.post(url, data=payload, timeout=self.timeout)
+                response = self.session.post(url, data=payload, headers=self.headers, timeout=self.timeout)
                 response.raise_for_status()
                 result = response.json()
                 if result.get('success', False):
@@ -107,7 +87,7 @@ class ImgurUploader:
         return [future.result() for future in futures]
 
     def __del__(self):
-        self.session.close()
+        # The HTTP session is the shared pool; only the executor belongs to us
         self.executor.shutdown(wait=False)
 
 # Example usage
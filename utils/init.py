@@ -1,37 +1,33 @@
 import streamlit as st
-import os
-
-def initialize():    
-    # Load header content
-    header_file_path = os.path.join('utils', 'header.md')
-    try:
-        with open(header_file_path, 'r', encoding='utf-8') as header_file:
-            header_content = header_file.read()
-    except FileNotFoundError:
-        st.error("header.md file not found in utils folder.")
-        header_content = ""  # Provide a default empty header
+from utils.assets import assets
 
+def parse_header(asset):
     # Extract title and image path from header content
-    header_lines = header_content.split('\n')
+    header_lines = asset.text.split('\n')
     title = header_lines[0].strip('# ')
     image_path = None    
     for line in header_lines:
         if line.startswith('!['):
             image_path = line.split('(')[1].split(')')[0]
             break
+    return title, image_path
+
+def initialize():    
+    # Header, CSS and footer are read once per process (utils/assets.py); reruns reuse them
+    try:
+        title, image_path = assets.fragment('utils/header.md', parse_header, key='header')
+    except FileNotFoundError:
+        st.error("header.md file not found in utils folder.")
+        title, image_path = "", None  # Provide a default empty header
 
     # Load external CSS
-    css_file_path = os.path.join('utils', 'styles.css')
-    with open(css_file_path, 'r') as f:
-        st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)    
+    st.markdown(assets.css('utils/styles.css'), unsafe_allow_html=True)    
     
     # Load footer content
-    footer_file_path = os.path.join('utils', 'footer.md')
     try:
-        with open(footer_file_path, 'r', encoding='utf-8') as footer_file:
-            footer_content = footer_file.read()
+        footer_content = assets.text('utils/footer.md')
     except FileNotFoundError:
         st.error("footer.md file not found in utils folder.")
         footer_content = ""  # Provide a default empty footer    
 
-    return title, image_path, footer_content
\ No newline at end of file
+    return title, image_path, footer_content
@@ -0,0 +1,267 @@
+import os
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from utils import tracing
+
+# Load environment variables
+load_dotenv()
+
+# Seconds; generation sits in the 5-60s range, cache hits and translations well under 1s
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    type_name = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, dict(key), value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that goes up and down per label set"""
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram per label set"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (+Inf last), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[Sample]:
+        result = []
+        with self._lock:
+            series_items = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series_items:
+            labels = dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                result.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            result.append((f"{self.name}_sum", labels, total))
+            result.append((f"{self.name}_count", labels, count))
+        return result
+
+
+class MetricsRegistry:
+    """Holds metrics plus collectors that read other components' stats at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """collector() yields (name, type, help, samples) for values owned elsewhere"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        families = [(m.name, m.type_name, m.help, m.samples()) for m in metrics]
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+
+        lines = []
+        for name, type_name, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+stage_latency = metrics.histogram("app_stage_duration_seconds", "Duration of traced stages (caption, translate, generate, send, ...)")
+stage_errors = metrics.counter("app_stage_errors_total", "Traced stages that raised or failed")
+
+
+def _record_span(span: tracing.Span):
+    # generate.<backend> and caption.<backend> attempts share one stage per kind, labelled by backend
+    if span.name.startswith("generate."):
+        labels = {"stage": "generate_attempt", "backend": span.name.partition(".")[2]}
+    elif span.name.startswith("caption."):
+        labels = {"stage": "caption_attempt", "backend": span.name.partition(".")[2]}
+    else:
+        labels = {"stage": span.name}
+    stage_latency.observe(span.duration, **labels)
+    if span.error:
+        stage_errors.inc(**labels)
+
+
+tracing.add_listener(_record_span)
+
+
+def _collect_resources():
+    """Cache hit ratios, in-flight requests and retries from whichever shared resources exist"""
+    from utils.registry import registry
+
+    cache_lookups = []
+    cache_ratio = []
+    caches = []
+    if registry.is_ready("caption_cache"):
+        caches.append(registry.get("caption_cache").stats())
+    if registry.is_ready("translation_service"):
+        caches.append(registry.get("translation_service").cache.stats())
+    if registry.is_ready("image_cache"):
+        caches.append(registry.get("image_cache").stats())
+    for stats in caches:
+        name = stats["namespace"]
+        hits = stats.get("hits", stats.get("memory_hits", 0) + stats.get("disk_hits", 0))
+        cache_lookups.append(("app_cache_lookups_total", {"cache": name, "result": "hit"}, hits))
+        cache_lookups.append(("app_cache_lookups_total", {"cache": name, "result": "miss"}, stats["misses"]))
+        cache_ratio.append(("app_cache_hit_ratio", {"cache": name}, stats["hit_ratio"]))
+    yield "app_cache_lookups_total", "counter", "Cache lookups by result", cache_lookups
+    yield "app_cache_hit_ratio", "gauge", "Cache hits / lookups since start", cache_ratio
+
+    in_flight, breaker_open, retries = [], [], []
+    if registry.is_ready("generator"):
+        generator = registry.get("generator")
+        for name, stats in getattr(generator, "backend_stats", lambda: {})().items():
+            in_flight.append(("app_backend_in_flight", {"backend": name}, stats["in_flight"]))
+            breaker_open.append(("app_backend_circuit_open", {"backend": name}, 0 if stats["state"] == "closed" else 1))
+        for name, backend in getattr(generator, "backends", {}).items():
+            policy = getattr(backend, "retry_policy", None)
+            if policy is not None:
+                retries.append(("app_retries_total", {"backend": name}, policy.retries))
+    yield "app_backend_in_flight", "gauge", "Generation requests currently running per backend", in_flight
+    caption_errors = []
+    if registry.is_ready("captioner"):
+        for name, stats in getattr(registry.get("captioner"), "backend_stats", lambda: {})().items():
+            caption_errors.append(("app_caption_backend_error_rate", {"backend": name}, stats["error_rate"]))
+    yield "app_caption_backend_error_rate", "gauge", "Recent error rate per captioning backend", caption_errors
+    yield "app_backend_circuit_open", "gauge", "1 while a backend's circuit breaker is open or half-open", breaker_open
+    yield "app_retries_total", "counter", "Retried generation attempts per backend", retries
+    speculative = []
+    if registry.is_ready("speculative_scheduler"):
+        speculative.append(("app_speculative_in_flight", {}, registry.get("speculative_scheduler").stats()["in_flight"]))
+    yield "app_speculative_in_flight", "gauge", "Speculative generations currently running", speculative
+
+
+metrics.add_collector(_collect_resources)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the app log
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics on a side port (METRICS_PORT); safe to call on every rerun, starts once"""
+    global _server
+    port = port if port is not None else int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or os.getenv("METRICS_HOST", "127.0.0.1"), port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics server not started on port {port}: {str(e)}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
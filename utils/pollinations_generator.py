@@ -1,18 +1,29 @@
+import asyncio
+import aiohttp
 import requests
-from PIL import Image
-import io
 import sys, os
 from urllib.parse import quote
-import base64
-import time
 import logging
+from utils import http_client
+from utils.image_cache import get_generated_image_cache
+from utils.image_payload import ImagePayload
+from utils.image_validation import InvalidImageError, validate_image
+from utils import tracing
+from utils.retry import RetryPolicy, RetryableError, FatalError, RetryError, is_retryable_status, parse_retry_after
+
+logger = logging.getLogger(__name__)
 
 class PollinationsGenerator:
-    def __init__(self):
+    def __init__(self, cache=None, retry_policy=None):
         self.pollinations_url = "https://image.pollinations.ai/prompt/{prompt}"
-        # Setup logging
-        logging.basicConfig(level=logging.INFO)
-        self.logger = logging.getLogger(__name__)
+        # Logging is configured once by the app entry point, not per instance
+        self.logger = logger
+        self.cache = cache if cache is not None else get_generated_image_cache()
+        self.request_timeout = float(os.getenv("GENERATION_REQUEST_TIMEOUT", "30"))
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=int(os.getenv("GENERATION_MAX_ATTEMPTS", "4")),
+            deadline=float(os.getenv("GENERATION_DEADLINE_SECONDS", "60")),
+        )
 
     def clean_text(self, text):
         """Clean text from HTML tags and normalize line breaks"""
@@ -24,133 +35,131 @@ class PollinationsGenerator:
         text = ' '.join(text.split())
         return text
 
-    def is_valid_image(self, image_data):
-        """Validate if the data is a proper image"""
+    def _fetch_image(self, url, params, remaining):
+        """One attempt: returns the validated image or raises a classified error"""
+        read_timeout = max(1.0, min(self.request_timeout, remaining))
         try:
-            # Try to open the image data with PIL
-            img = Image.open(io.BytesIO(image_data))
-            img.verify()
-            
-            # Check image dimensions
-            img = Image.open(io.BytesIO(image_data))  # Need to reopen after verify
-            width, height = img.size
-            
-            # Check if image dimensions are reasonable (not too small)
-            if width < 100 or height < 100:
-                return False
-                
-            # Check if image isn't completely black or white
-            if img.mode == 'RGB':
-                extrema = img.getextrema()
-                is_solid_color = all(min_val == max_val for min_val, max_val in extrema)
-                if is_solid_color:
-                    return False
-            
-            return True
-        except Exception as e:
-            self.logger.error(f"Image validation failed: {e}")
-            return False
+            response = http_client.get(url, params=params, timeout=(http_client.CONNECT_TIMEOUT, read_timeout))
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"Request failed: {e}")
+            raise RetryableError(str(e))
+
+        if response.status_code != 200:
+            message = f"Pollinations returned HTTP {response.status_code}"
+            self.logger.warning(message)
+            if is_retryable_status(response.status_code):
+                raise RetryableError(message, retry_after=parse_retry_after(response.headers.get('Retry-After')))
+            raise FatalError(message)
 
-    def _save_image_to_file(self, image_data):
-        """Save image data to a temporary file and return the filename"""
         try:
-            timestamp = int(time.time())
-            filename = f'temp_image_{timestamp}.jpg'
-            
-            # Ensure the image is in JPEG format
-            img = Image.open(io.BytesIO(image_data))
-            if img.mode in ('RGBA', 'LA'):
-                # Convert RGBA to RGB for JPEG compatibility
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1])
-                img = background
-            
-            # Save with optimized quality
-            img.save(filename, 'JPEG', quality=95, optimize=True)
-            self.logger.info(f"Image saved successfully to {filename}")
-            
-            # Read back the file and convert to base64
-            with open(filename, 'rb') as f:
-                image_data = f.read()
-                image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            # Clean up the temporary file
-            os.remove(filename)
-            return f"data:image/jpeg;base64,{image_base64}"
-            
+            return validate_image(response.content)
+        except InvalidImageError as e:
+            self.logger.warning(f"Image validation failed: {e}")
+            raise RetryableError(f"Pollinations returned an invalid image: {e}")
+
+    async def _fetch_image_async(self, url, params, remaining):
+        """Async _fetch_image on the loop's pooled aiohttp session"""
+        read_timeout = max(1.0, min(self.request_timeout, remaining))
+        session = http_client.get_async_session()
+        try:
+            async with asyncio.timeout(read_timeout):
+                async with session.get(url, params={k: str(v) for k, v in params.items()}) as response:
+                    content = await response.read()
+        except (aiohttp.ClientError, TimeoutError) as e:
+            self.logger.warning(f"Request failed: {e!r}")
+            raise RetryableError(repr(e))
+
+        if response.status != 200:
+            message = f"Pollinations returned HTTP {response.status}"
+            self.logger.warning(message)
+            if is_retryable_status(response.status):
+                raise RetryableError(message, retry_after=parse_retry_after(response.headers.get('Retry-After')))
+            raise FatalError(message)
+
+        try:
+            # Decoding the sample is CPU work; keep it off the event loop
+            return await asyncio.to_thread(validate_image, content)
+        except InvalidImageError as e:
+            self.logger.warning(f"Image validation failed: {e}")
+            raise RetryableError(f"Pollinations returned an invalid image: {e}")
+
+    def _prepare_request(self, prompt, model_name, style):
+        """URL, query parameters and cache key for one generation request"""
+        cleaned_prompt = self.clean_text(prompt)
+        params = {
+            'model': model_name,
+            'width': 1280,
+            'height': 720,
+            'seed': 10,
+            'nologo': 'true',
+            'enhance': 'true'
+        }
+        # Same request was already generated (fixed seed -> same image)
+        cache_key = self.cache.make_key(
+            cleaned_prompt, style, model_name, params['seed'], params['width'], params['height']
+        )
+        url = self.pollinations_url.format(prompt=quote(cleaned_prompt))
+        return url, params, cache_key
+
+    @http_client.shared_loop
+    async def generate_image_async(self, prompt, model_name="flux", style=None):
+        """
+        Async generate_image: same cache and retry policy, but waits with
+        asyncio instead of blocking the thread, and can be cancelled.
+        """
+        try:
+            url, params, cache_key = self._prepare_request(prompt, model_name, style)
+            cached_image = self.cache.get(cache_key)
+            tracing.annotate(cache_hit=bool(cached_image))
+            if cached_image:
+                self.logger.info("Generated image served from cache")
+                return ImagePayload(cached_image)
+
+            self.logger.info(f"Requesting pollinations_url from: {url}")
+            try:
+                payload = await self.retry_policy.call_async(
+                    lambda remaining: self._fetch_image_async(url, params, remaining)
+                )
+            except (RetryError, FatalError) as e:
+                self.logger.error(f"Image generation failed: {e}")
+                return None
+
+            self.cache.set(cache_key, payload.data)
+            return payload
         except Exception as e:
-            self.logger.error(f"Error in save_image_to_file: {e}")
+            self.logger.error(f"Unexpected error in generate_image_async: {e}")
             return None
 
-    def generate_image(self, prompt, model_name="flux"):
+    def generate_image(self, prompt, model_name="flux", style=None):
         """
         Generate image and return as data URI with improved error handling
         Args:
             prompt (str): The text description for image generation
             model_name (str): Model to use (flux/turbo)
+            style (str): Style name, part of the cache key
         Returns:
-            str: Data URI of the generated image or None if failed
+            ImagePayload: The generated image or None if failed
         """
         try:
-            # Encode the prompt for URL
-            encoded_prompt = quote(self.clean_text(prompt))
-            
-            # Set up the parameters
-            params = {
-                'model': model_name,
-                'width': 1280,
-                'height': 720,
-                'seed': 10,
-                'nologo': 'true',
-                'enhance': 'true'
-            }
+            url, params, cache_key = self._prepare_request(prompt, model_name, style)
+            cached_image = self.cache.get(cache_key)
+            tracing.annotate(cache_hit=bool(cached_image))
+            if cached_image:
+                self.logger.info("Generated image served from cache")
+                return ImagePayload(cached_image)
             
-            # Build the complete URL
-            url = self.pollinations_url.format(prompt=encoded_prompt)
             self.logger.info(f"Requesting pollinations_url from: {url}")
             
             # Make the request to Pollinations API with retry logic
-            max_retries = 4
-            retry_delay = 5  # seconds
-            wait_time = 2  # Initial wait time between request and validation
-            
-            for attempt in range(max_retries):
-                try:
-                    response = requests.get(url, params=params, timeout=30)
-                    
-                    if response.status_code == 200:
-                        time.sleep(wait_time)
-                        
-                        if response.content and self.is_valid_image(response.content):
-                            try:
-                                # First attempt: direct base64 encoding
-                                image_base64 = base64.b64encode(response.content).decode('utf-8')
-                                return f"data:image/jpeg;base64,{image_base64}"
-                            except Exception as encode_error:
-                                self.logger.warning(f"Direct base64 encoding failed: {encode_error}")
-                                self.logger.info("Attempting file-based conversion...")
-                                
-                                # Second attempt: file-based approach
-                                result = self._save_image_to_file(response.content)
-                                if result:
-                                    return result
-                                
-                                self.logger.error("Both conversion methods failed")
-                                return None
-                        else:
-                            # If validation failed, increase wait time and retry
-                            wait_time = min(wait_time * 1.5, 10)  # Max 10 seconds wait
-                            if attempt < max_retries - 1:
-                                continue
-                            
-                except requests.exceptions.RequestException as e:
-                    if attempt < max_retries - 1:
-                        self.logger.warning(f"Attempt {attempt + 1} failed, retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                    else:
-                        self.logger.error(f"Failed after {max_retries} attempts: {e}")
-                        return None
+            try:
+                payload = self.retry_policy.call(lambda remaining: self._fetch_image(url, params, remaining))
+            except (RetryError, FatalError) as e:
+                self.logger.error(f"Image generation failed: {e}")
+                return None
+
+            # Validation already read the header, so the payload needs no second pass
+            self.cache.set(cache_key, payload.data)
+            return payload
                         
         except Exception as e:
             self.logger.error(f"Unexpected error in generate_image: {e}")
@@ -164,22 +173,18 @@ def test():
     result = generator.generate_image(test_prompt, "flux")
     
     if result:
-        # Test the base64 string validity
         try:
-            # Extract the base64 part
-            base64_str = result.split(',')[1]
-            # Try to decode it
-            decoded = base64.b64decode(base64_str)
-            print("✓ Success - base64 encoding is valid")
+            print(f"✓ Success - {result.mime_type} {result.width}x{result.height}")
             
             # Save test image
-            with open('test_output.jpg', 'wb') as f:
-                f.write(decoded)
-            print("✓ Success - saved as test_output.jpg")
+            with open(f'test_output.{result.extension}', 'wb') as f:
+                f.write(result.data)
+            print(f"✓ Success - saved as test_output.{result.extension}")
         except Exception as e:
-            print(f"✗ Failed to validate base64 string: {e}")
+            print(f"✗ Failed to save image: {e}")
     else:
         print("✗ Failed to generate image")
             
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     test()
\ No newline at end of file
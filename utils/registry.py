@@ -0,0 +1,260 @@
+import atexit
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class ResourceRegistry:
+    """
+    Builds long-lived clients once per process and shares them across Streamlit sessions.
+    Resources are created lazily on first get() and closed in reverse order on shutdown().
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._created = []
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], None]] = None):
+        with self._lock:
+            self._factories[name] = factory
+            self._closers[name] = close
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource: {name}")
+        # Per-resource lock: a slow build does not block unrelated resources
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = self._factories[name]()
+                with self._lock:
+                    self._instances[name] = instance
+                    self._created.append(name)
+        return instance
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def reset(self, name: str):
+        """Close and forget one resource; the next get() rebuilds it"""
+        with self._lock:
+            instance = self._instances.pop(name, None)
+            if name in self._created:
+                self._created.remove(name)
+        if instance is not None:
+            self._close(name, instance)
+
+    def _close(self, name: str, instance: Any):
+        closer = self._closers.get(name)
+        if closer is None:
+            return
+        try:
+            closer(instance)
+        except Exception as e:
+            print(f"Error closing {name}: {str(e)}")
+
+    def shutdown(self):
+        """Close every created resource, newest first"""
+        with self._lock:
+            created = list(reversed(self._created))
+            instances = dict(self._instances)
+            self._created.clear()
+            self._instances.clear()
+        for name in created:
+            self._close(name, instances[name])
+
+
+registry = ResourceRegistry()
+atexit.register(registry.shutdown)
+
+
+def _build_captioner():
+    """Groq alone, or a hedging router when CAPTION_BACKENDS lists several backends"""
+    import os
+    from utils.groq_image_captioner import GroqImageCaptioner
+    from utils.captioner_backends import CaptionerRouter, StubCaptioner
+    backends = []
+    for name in os.getenv("CAPTION_BACKENDS", "groq").split(","):
+        name = name.strip()
+        if name == "groq":
+            backends.append((name, GroqImageCaptioner(cache=registry.get("caption_cache"))))
+        elif name == "blip":
+            try:
+                from utils.Hugging_Face_Transformer import ImageCaptioning
+            except ImportError as e:
+                print(f"Local captioning disabled, torch/transformers not installed: {str(e)}")
+                continue
+            backends.append((name, ImageCaptioning()))
+        elif name == "stub":
+            backends.append((name, StubCaptioner()))
+        elif name:
+            print(f"Unknown caption backend {name}, expected groq, blip or stub")
+    if not backends:
+        raise ValueError(
+            f"No caption backend available from CAPTION_BACKENDS={os.getenv('CAPTION_BACKENDS', 'groq')!r}. "
+            "Use groq (needs GROQ_API_KEY), blip (needs torch and transformers installed) or stub."
+        )
+    if len(backends) == 1:
+        return backends[0][1]
+    return CaptionerRouter(backends)
+
+
+def _build_generator():
+    """Backends from GENERATION_BACKENDS behind a dispatcher that routes by style and fails over"""
+    import os
+    from utils.generator_backends import GeneratorDispatcher
+    registry.get("http_session")
+    backends = []
+    for name in os.getenv("GENERATION_BACKENDS", "pollinations").split(","):
+        name = name.strip()
+        try:
+            if name == "pollinations":
+                from utils.pollinations_generator import PollinationsGenerator
+                backends.append((name, PollinationsGenerator(cache=registry.get("image_cache"))))
+            elif name == "together":
+                from utils.Together_image_generator import ImageGenerator
+                backends.append((name, ImageGenerator()))
+            elif name == "unsplash":
+                from utils.unsplash_generator import UnsplashGenerator
+                backends.append((name, UnsplashGenerator()))
+            elif name:
+                print(f"Unknown generator backend {name}, expected pollinations, together or unsplash")
+        except Exception as e:
+            print(f"Generator backend {name} disabled: {str(e)}")
+    if not backends:
+        raise ValueError(
+            f"No generator backend available from GENERATION_BACKENDS={os.getenv('GENERATION_BACKENDS', 'pollinations')!r}. "
+            "Use pollinations (no key needed), together (needs the together package and TOGETHER_API_KEY) "
+            "or unsplash (needs UNSPLASH_ACCESS_KEY)."
+        )
+    # The catalog is looked up per request: a missing or broken styles file must not stop generation
+    return GeneratorDispatcher(backends, styles=lambda: registry.get("style_catalog"))
+
+
+def _build_telegram_sender():
+    from utils.TelegramSender import TelegramSender
+    return TelegramSender()
+
+
+def _build_telegram_dispatcher():
+    from utils.telegram_dispatcher import TelegramDispatcher
+    return TelegramDispatcher(registry.get("telegram_sender"))
+
+
+def _build_translation_service():
+    from utils.translation import TranslationService
+    return TranslationService()
+
+
+def _build_whatsapp_sender():
+    from utils.greenapi import WhatsAppSender
+    registry.get("http_session")
+    return WhatsAppSender()
+
+
+def _build_image_cache():
+    from utils.image_cache import get_generated_image_cache
+    return get_generated_image_cache()
+
+
+def _build_caption_cache():
+    from utils.groq_image_captioner import get_caption_cache
+    return get_caption_cache()
+
+
+def _build_style_catalog():
+    from utils.style_catalog import StyleCatalog
+    # Looked up on first use: the catalog (and the generator that needs it) must not fail with the store
+    return StyleCatalog(usage_store=lambda: registry.get("counter_store"))
+
+
+def _build_speculative_scheduler():
+    from utils.speculative import SpeculativeScheduler
+    return SpeculativeScheduler(registry.get("generator"), registry.get("style_catalog"),
+                                registry.get("translation_service"), loop_thread=registry.get("event_loop"))
+
+
+def _build_counter_store():
+    import os
+    from utils.counter_store import build_counter_store
+    store = build_counter_store()
+    # First run on a fresh store: carry over the count that used to live in .env.
+    # Only queued here; the flush thread writes it, so an unreachable store cannot block this
+    try:
+        store.seed("users", int(os.getenv("COUNTER", "0")))
+    except ValueError:
+        pass
+    return store
+
+
+def _build_http_session():
+    from utils import http_client
+    return http_client.get_session()
+
+
+def _build_event_loop():
+    from utils import http_client
+    return http_client.LoopThread()
+
+
+def _close_http_session(_session):
+    from utils import http_client
+    http_client.close()
+
+
+registry.register("http_session", _build_http_session, close=_close_http_session)
+registry.register("event_loop", _build_event_loop, close=lambda loop_thread: loop_thread.close())
+registry.register("caption_cache", _build_caption_cache, close=lambda cache: cache.close())
+registry.register("image_cache", _build_image_cache)
+registry.register("captioner", _build_captioner)
+registry.register("generator", _build_generator)
+registry.register("telegram_sender", _build_telegram_sender)
+registry.register("telegram_dispatcher", _build_telegram_dispatcher, close=lambda dispatcher: dispatcher.shutdown())
+registry.register("whatsapp_sender", _build_whatsapp_sender)
+registry.register("translation_service", _build_translation_service, close=lambda service: service.close())
+registry.register("counter_store", _build_counter_store, close=lambda store: store.close())
+registry.register("style_catalog", _build_style_catalog)
+registry.register("speculative_scheduler", _build_speculative_scheduler, close=lambda scheduler: scheduler.close())
+
+
+def get_captioner():
+    return registry.get("captioner")
+
+
+def get_generator():
+    return registry.get("generator")
+
+
+def get_telegram_sender():
+    return registry.get("telegram_sender")
+
+
+def get_telegram_dispatcher():
+    return registry.get("telegram_dispatcher")
+
+
+def get_whatsapp_sender():
+    return registry.get("whatsapp_sender")
+
+
+def get_translation_service():
+    return registry.get("translation_service")
+
+
+def get_counter_store():
+    return registry.get("counter_store")
+
+
+def get_style_catalog():
+    return registry.get("style_catalog")
+
+
+def get_speculative_scheduler():
+    return registry.get("speculative_scheduler")
@@ -0,0 +1,201 @@
+import time
+import asyncio
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """A failure worth another attempt, optionally with a server-suggested delay"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FatalError(Exception):
+    """A failure that another attempt will not fix (bad request, auth, ...)"""
+
+
+class RetryError(Exception):
+    """Raised when attempts or the deadline run out"""
+
+    def __init__(self, message: str, last_error: Optional[Exception] = None):
+        super().__init__(message)
+        self.last_error = last_error
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds; accepts delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code in RETRYABLE_STATUS
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter under a total deadline.
+    There is no delay after a successful attempt.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 60.0, sleep: Callable[[float], None] = time.sleep):
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def next_delay(self, attempt: int, error: Exception, remaining: float) -> Optional[float]:
+        """Delay before the next attempt, or None when it is not worth trying again"""
+        if attempt + 1 >= self.max_attempts:
+            return None
+        retry_after = getattr(error, "retry_after", None)
+        delay = retry_after if retry_after is not None else self.backoff(attempt)
+        if delay >= remaining:
+            return None
+        return delay
+
+    def call(self, func: Callable[[float], object]):
+        """
+        Run func(remaining_seconds) until it succeeds.
+        func raises RetryableError to try again and FatalError (or anything else) to stop.
+        """
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+        attempts = 0
+        for attempt in range(self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            attempts += 1
+            try:
+                return func(remaining)
+            except RetryableError as e:
+                last_error = e
+            delay = self.next_delay(attempt, last_error, deadline - time.monotonic())
+            if delay is None:
+                break
+            with self._lock:
+                self.retries += 1
+            self._sleep(delay)
+        raise RetryError(f"Gave up after {attempts} attempts: {last_error}", last_error)
+
+    async def call_async(self, func: Callable[[float], Awaitable[object]]):
+        """
+        Async call(): each attempt runs under asyncio.timeout(remaining) and the
+        backoff is asyncio.sleep, so cancelling the caller stops at once.
+        """
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+        attempts = 0
+        for attempt in range(self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            attempts += 1
+            try:
+                async with asyncio.timeout(remaining):
+                    return await func(remaining)
+            except RetryableError as e:
+                last_error = e
+            except TimeoutError:
+                last_error = RetryableError(f"Timed out after {remaining:.1f}s")
+                break
+            delay = self.next_delay(attempt, last_error, deadline - time.monotonic())
+            if delay is None:
+                break
+            with self._lock:
+                self.retries += 1
+            await asyncio.sleep(delay)
+        raise RetryError(f"Gave up after {attempts} attempts: {last_error}", last_error)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend whose recent error rate spiked.
+    Closed: calls pass. Open: calls are refused until reset_timeout has passed.
+    Half-open: one trial call decides whether to close again or stay open.
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 5, max_error_rate: float = 0.5,
+                 reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.max_error_rate = max_error_rate
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; in half-open state only one trial call does"""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            if self._opened_at is not None:
+                # Outcome of the half-open trial
+                self._trial_running = False
+                if ok:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = self._clock()
+                return
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) > self.max_error_rate:
+                self._opened_at = self._clock()
+
+    def release(self):
+        """Give back a half-open trial slot that was granted but not used"""
+        with self._lock:
+            self._trial_running = False
@@ -0,0 +1,112 @@
+import os
+import threading
+from io import BytesIO
+from typing import List, Optional
+from PIL import Image
+
+SUPPORTED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+
+class SampleImage:
+    """One example image: a small thumbnail in memory, full bytes read from disk on demand"""
+    __slots__ = ("path", "name", "format", "mtime", "size", "thumbnail")
+
+    def __init__(self, path: str, format: str, mtime: float, size: tuple, thumbnail: bytes):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.format = format
+        self.mtime = mtime
+        self.size = size
+        self.thumbnail = thumbnail
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    def read_bytes(self) -> bytes:
+        """Load the full-resolution file only once the sample is actually chosen"""
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class SampleGallery:
+    """Index of the examples directory, rebuilt only when files change"""
+
+    def __init__(self, directory: str = "examples", thumb_size: int = 320,
+                 thumb_format: str = "WEBP", thumb_quality: int = 70):
+        self.directory = directory
+        self.thumb_size = thumb_size
+        self.thumb_format = thumb_format
+        self.thumb_quality = thumb_quality
+        self._lock = threading.Lock()
+        self._signature = None
+        self._samples: List[SampleImage] = []
+
+    def _scan(self) -> tuple:
+        """Cheap directory fingerprint: file names with their mtimes and sizes"""
+        entries = []
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_mtime, stat.st_size))
+        return tuple(sorted(entries))
+
+    def _make_thumbnail(self, img: Image.Image) -> bytes:
+        img.thumbnail((self.thumb_size, self.thumb_size))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        output = BytesIO()
+        try:
+            img.save(output, format=self.thumb_format, quality=self.thumb_quality)
+        except (KeyError, OSError):
+            # Pillow built without WebP support
+            output = BytesIO()
+            img.save(output, format="JPEG", quality=self.thumb_quality, optimize=True)
+        return output.getvalue()
+
+    def _load_sample(self, path: str, mtime: float, previous: Optional[SampleImage]) -> Optional[SampleImage]:
+        if previous is not None and previous.mtime == mtime:
+            return previous
+        try:
+            with Image.open(path) as img:
+                # Trust the file signature, not the extension
+                if img.format not in SUPPORTED_FORMATS:
+                    return None
+                # Before draft(), which shrinks img.size to the decoded size
+                img_format, size = img.format, img.size
+                if img.format == "JPEG":
+                    img.draft("RGB", (self.thumb_size, self.thumb_size))
+                thumbnail = self._make_thumbnail(img)
+            return SampleImage(path, img_format, mtime, size, thumbnail)
+        except Exception:
+            return None
+
+    def refresh(self) -> bool:
+        """Rebuild the index if the directory changed; returns True when rebuilt"""
+        signature = self._scan()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature == self._signature:
+                return False
+            previous = {sample.name: sample for sample in self._samples}
+            samples = []
+            for name, mtime, _ in signature:
+                sample = self._load_sample(os.path.join(self.directory, name), mtime, previous.get(name))
+                if sample is not None:
+                    samples.append(sample)
+            self._samples = samples
+            self._signature = signature
+            return True
+
+    def samples(self) -> List[SampleImage]:
+        self.refresh()
+        return self._samples
+
+
+# Test functionality
+if __name__ == "__main__":
+    gallery = SampleGallery()
+    for sample in gallery.samples():
+        print(f"{sample.name}: {sample.format} {sample.size}, thumbnail {len(sample.thumbnail)} bytes")
@@ -0,0 +1,150 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from utils import http_client
+from utils import tracing
+from utils.metrics import metrics
+
+# Load environment variables
+load_dotenv()
+
+ENABLED = os.getenv("SPECULATIVE_GENERATION", "0").lower() in ("1", "true", "yes")
+
+# Only this backend caches its results, so only its styles are worth guessing
+CACHING_BACKEND = "pollinations"
+
+speculative_results = metrics.counter(
+    "app_speculative_generations_total",
+    "Speculative generations by outcome (completed, failed, cancelled, used)",
+)
+
+
+class Speculation:
+    """The guesses started for one session and one description"""
+
+    def __init__(self, prompt: str, futures: Dict[str, Future]):
+        self.prompt = prompt
+        self.futures = futures
+
+    def matches(self, prompt: str) -> bool:
+        return prompt == self.prompt
+
+    async def wait(self, style: str, prompt: str) -> bool:
+        """
+        Wait for the guess for style, if one is running for this exact description.
+        Afterwards the real request is a cache hit. True if a guess was used.
+        """
+        future = self.futures.pop(style, None) if self.matches(prompt) else None
+        if future is None:
+            return False
+        try:
+            image = await asyncio.wrap_future(future)
+        except Exception:
+            return False
+        if image is not None:
+            speculative_results.inc(result="used")
+        return image is not None
+
+    def cancel(self):
+        """Drop the guesses nobody picked (navigation, start over, edited description)"""
+        for future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
+
+
+class SpeculativeScheduler:
+    """
+    While the user reads the caption and picks a style, generate the top-K styles in the
+    background so the picked one is often already in the generated-image cache. Runs on
+    the shared event loop, so guesses outlive the rerun that started them and can be
+    cancelled mid-request. A per-server budget caps how many guesses run at once.
+    """
+
+    def __init__(self, generator, catalog, translator, top_k: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, order: Optional[str] = None, loop_thread=None):
+        self.generator = generator
+        self.catalog = catalog
+        self.translator = translator
+        self.top_k = top_k or int(os.getenv("SPECULATIVE_TOP_K", "2"))
+        self.max_concurrency = max_concurrency or int(os.getenv("SPECULATIVE_MAX_CONCURRENCY", "4"))
+        # popularity (popularity_rank) or usage (what users actually pick)
+        self.order = order or os.getenv("SPECULATIVE_ORDER", "popularity")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.loop_thread = loop_thread or http_client.get_shared_loop()
+        self._futures = set()
+
+    def _backend(self):
+        """The caching backend, unless it is missing or its circuit is open"""
+        backend = getattr(self.generator, "backends", {}).get(CACHING_BACKEND)
+        breaker = getattr(self.generator, "breakers", {}).get(CACHING_BACKEND)
+        if breaker is not None and breaker.state != "closed":
+            return None
+        return backend
+
+    def _candidates(self) -> List:
+        default = getattr(self.generator, "order", [CACHING_BACKEND])[0]
+        styles = [
+            style for style in self.catalog.ordered(self.order)
+            if (self.catalog.backend_for(style.name) or default) == CACHING_BACKEND
+        ]
+        return styles[:self.top_k]
+
+    def start(self, prompt: str) -> Speculation:
+        """Start guesses for prompt (the description as shown to the user) within the free budget"""
+        futures = {}
+        backend = self._backend()
+        if backend is None or not prompt:
+            return Speculation(prompt, futures)
+        trace_id = tracing.current_trace_id()
+        for style in self._candidates():
+            with self._lock:
+                if self._in_flight >= self.max_concurrency:
+                    break
+                self._in_flight += 1
+            future = self.loop_thread.submit(self._generate(backend, style, prompt, trace_id))
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(self._forget)
+            futures[style.name] = future
+        return Speculation(prompt, futures)
+
+    def _forget(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    async def _generate(self, backend, style, prompt: str, trace_id: Optional[str]):
+        try:
+            with tracing.span("speculate", trace_id=trace_id, style=style.name):
+                # Same text the page builds: the description translated back to English
+                english = await self.translator.translate_async(prompt, 'en')
+                image = await backend.generate_image_async(style.full_prompt(english), style.model, style=style.name)
+            speculative_results.inc(result="completed" if image is not None else "failed")
+            return image
+        except asyncio.CancelledError:
+            speculative_results.inc(result="cancelled")
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"in_flight": self._in_flight, "max_concurrency": self.max_concurrency, "top_k": self.top_k}
+
+    def close(self):
+        """Cancel the guesses still running; the shared loop itself is closed by the registry"""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+
+def cancel_speculation(session_state):
+    """Cancel the session's pending guesses, e.g. when it leaves the process page"""
+    speculation = session_state.get("speculation")
+    if speculation is not None:
+        speculation.cancel()
+        session_state["speculation"] = None
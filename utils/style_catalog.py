@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import threading
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+FREE_STYLE = "סגנון חופשי"
+DEFAULT_MODEL = "flux"
+
+
+class StyleCatalogError(ValueError):
+    """The styles file is missing or does not match the expected schema"""
+
+
+class Style:
+    """One entry of data/image_styles.json"""
+    __slots__ = ("name", "prompt_prefix", "model", "popularity_rank", "backend")
+
+    def __init__(self, name: str, prompt_prefix: str, model: str = DEFAULT_MODEL,
+                 popularity_rank: Optional[int] = None, backend: Optional[str] = None):
+        self.name = name
+        self.prompt_prefix = prompt_prefix
+        self.model = model
+        self.popularity_rank = popularity_rank
+        self.backend = backend
+
+    @classmethod
+    def from_dict(cls, data: dict, index: int) -> "Style":
+        if not isinstance(data, dict):
+            raise StyleCatalogError(f"Style #{index} is not an object")
+        name = data.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise StyleCatalogError(f"Style #{index} has no name")
+        prompt_prefix = data.get("prompt_prefix")
+        if not isinstance(prompt_prefix, str):
+            raise StyleCatalogError(f"Style {name} has no prompt_prefix")
+        model = data.get("model", DEFAULT_MODEL)
+        if not isinstance(model, str) or not model:
+            raise StyleCatalogError(f"Style {name} has an invalid model: {model!r}")
+        rank = data.get("popularity_rank")
+        if rank is not None and (isinstance(rank, bool) or not isinstance(rank, int)):
+            raise StyleCatalogError(f"Style {name} has a non-integer popularity_rank: {rank!r}")
+        backend = data.get("backend")
+        if backend is not None and not isinstance(backend, str):
+            raise StyleCatalogError(f"Style {name} has an invalid backend: {backend!r}")
+        return cls(name, prompt_prefix, model, rank, backend)
+
+    def full_prompt(self, prompt: str) -> str:
+        return f"{self.prompt_prefix} {prompt}"
+
+    def __repr__(self):
+        return f"Style({self.name!r}, model={self.model!r}, rank={self.popularity_rank})"
+
+
+class _Snapshot:
+    """Styles plus their indexes, built together and swapped in as one object"""
+    __slots__ = ("styles", "by_name", "by_model", "by_popularity", "by_name_order", "routes", "stamp")
+
+    def __init__(self, styles: Tuple[Style, ...], stamp: Tuple[float, int]):
+        self.styles = styles
+        self.by_name: Dict[str, Style] = {style.name: style for style in styles}
+        by_model: Dict[str, List[Style]] = {}
+        for style in styles:
+            by_model.setdefault(style.model, []).append(style)
+        self.by_model = {model: tuple(group) for model, group in by_model.items()}
+        # Styles without a rank go last; the free style always leads
+        self.by_popularity = _free_first(sorted(
+            styles, key=lambda s: (s.popularity_rank is None, s.popularity_rank or 0, s.name)))
+        self.by_name_order = _free_first(sorted(styles, key=lambda s: s.name))
+        self.routes = {style.name: style.backend for style in styles if style.backend}
+        self.stamp = stamp
+
+
+def _free_first(styles: List[Style]) -> Tuple[Style, ...]:
+    return tuple([s for s in styles if s.name == FREE_STYLE] + [s for s in styles if s.name != FREE_STYLE])
+
+
+def parse_styles(data) -> Tuple[Style, ...]:
+    """Validate the decoded JSON and build the records; raises StyleCatalogError"""
+    if not isinstance(data, dict) or not isinstance(data.get("styles"), list):
+        raise StyleCatalogError('Expected an object with a "styles" list')
+    styles = tuple(Style.from_dict(item, index) for index, item in enumerate(data["styles"]))
+    names = Counter(style.name for style in styles)
+    duplicates = [name for name, count in names.items() if count > 1]
+    if duplicates:
+        raise StyleCatalogError(f"Duplicate style names: {', '.join(duplicates)}")
+    return styles
+
+
+class StyleCatalog:
+    """
+    The styles file parsed once per process, with O(1) lookup by name and prebuilt
+    orderings. Edits to the file are picked up on the next access (checked at most
+    every check_interval seconds); a broken edit keeps the last good version.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: Optional[float] = None, usage_store=None):
+        self.path = path or os.getenv("STYLE_CATALOG_PATH", os.path.join("data", "image_styles.json"))
+        self.check_interval = check_interval if check_interval is not None else float(os.getenv("STYLE_CATALOG_CHECK_SECONDS", "2"))
+        # Anything with incr(name)/get(name), e.g. the counter store, to share usage across replicas,
+        # or a zero-argument callable returning one, resolved on first use so the catalog never
+        # depends on the store being up
+        self.usage_store = usage_store
+        self._usage: Counter = Counter()
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._failed_stamp = None
+        self._snapshot = self._load()
+
+    def _stamp(self) -> Tuple[float, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime, stat.st_size
+
+    def _load(self) -> _Snapshot:
+        try:
+            stamp = self._stamp()
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise StyleCatalogError(f"Cannot read {self.path}: {e}")
+        self._last_check = time.monotonic()
+        return _Snapshot(parse_styles(data), stamp)
+
+    def _current(self) -> _Snapshot:
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.reload_if_changed()
+        return self._snapshot
+
+    def reload_if_changed(self) -> bool:
+        """Swap in a new snapshot when the file changed; True if it did"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                stamp = self._stamp()
+            except OSError as e:
+                print(f"Keeping the previous styles, cannot stat {self.path}: {str(e)}")
+                return False
+            if stamp == self._snapshot.stamp or stamp == self._failed_stamp:
+                return False
+            try:
+                snapshot = self._load()
+            except StyleCatalogError as e:
+                # Reported once per broken version of the file
+                self._failed_stamp = stamp
+                print(f"Keeping the previous styles, reload failed: {str(e)}")
+                return False
+            self._snapshot = snapshot
+            return True
+
+    def get(self, name: str) -> Optional[Style]:
+        return self._current().by_name.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._current().by_name
+
+    def __len__(self) -> int:
+        return len(self._current().styles)
+
+    def __iter__(self) -> Iterator[Style]:
+        return iter(self._current().styles)
+
+    def for_model(self, model: str) -> Tuple[Style, ...]:
+        return self._current().by_model.get(model, ())
+
+    def backend_for(self, name: Optional[str]) -> Optional[str]:
+        """Backend the style asks for (optional "backend" field), used by the generator dispatcher"""
+        return self._current().routes.get(name)
+
+    def _store(self):
+        """The usage store, or None when there is none or it is unavailable"""
+        store = self.usage_store
+        if callable(store):
+            try:
+                store = store()
+            except Exception as e:
+                print(f"Style usage store is unavailable: {str(e)}")
+                return None
+        return store
+
+    def record_usage(self, name: str):
+        """Count a generation in this style, for order="usage" """
+        self._usage[name] += 1
+        try:
+            store = self._store()
+            if store is not None:
+                store.incr(f"style:{name}")
+        except Exception as e:
+            print(f"Error recording style usage: {str(e)}")
+
+    def usage(self, name: str) -> int:
+        try:
+            store = self._store()
+            if store is not None:
+                return store.get(f"style:{name}") or 0
+        except Exception:
+            pass
+        return self._usage[name]
+
+    def ordered(self, order: Optional[str] = None) -> List[Style]:
+        """
+        Styles for display, the free style first. order is "popularity" (popularity_rank),
+        "usage" (most generated first, popularity breaking ties) or "name"; default STYLE_ORDER.
+        """
+        order = order or os.getenv("STYLE_ORDER", "popularity")
+        snapshot = self._current()
+        if order == "name":
+            return list(snapshot.by_name_order)
+        if order == "usage":
+            usage = self._usage_counts(snapshot.styles)
+            if usage is not None:
+                return list(_free_first(sorted(snapshot.by_popularity, key=lambda s: -usage[s.name])))
+        return list(snapshot.by_popularity)
+
+    def _usage_counts(self, styles) -> Optional[Dict[str, int]]:
+        """Usage per style; None if the configured store is unavailable (order by popularity then)"""
+        if self.usage_store is None:
+            return {style.name: self._usage[style.name] for style in styles}
+        try:
+            store = self._store()
+            if store is None:
+                return None
+            return {style.name: store.get(f"style:{style.name}") or 0 for style in styles}
+        except Exception as e:
+            print(f"Error reading style usage, ordering by popularity: {str(e)}")
+            return None
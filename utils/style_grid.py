@@ -0,0 +1,72 @@
+import os
+import streamlit as st
+from typing import Awaitable, Callable, List, Optional, Tuple
+from utils.batch_generator import BatchGenerator
+from utils.image_payload import ImagePayload
+from utils.registry import get_generator, get_style_catalog
+from utils.style_catalog import Style
+
+MAX_COMPARE_STYLES = int(os.getenv("MAX_COMPARE_STYLES", "4"))
+
+
+def load_styles() -> List[Style]:
+    """Styles in display order (STYLE_ORDER) from the shared catalog"""
+    try:
+        return get_style_catalog().ordered()
+    except Exception as e:
+        st.error(f"שגיאה בטעינת הסגנונות: {e}")
+        return []
+
+
+async def style_comparison_section(styles: List[Style], get_prompt: Callable[[], Awaitable[str]],
+                                   key: str = "compare") -> Optional[Tuple[str, ImagePayload]]:
+    """
+    Let the user pick several styles, generate them concurrently and show them in a grid
+    as they finish. Returns (style name, image) when the user picks one of the results.
+    """
+    st.markdown("""
+    <div class='custom-section'>
+        <h3 style='color: #1e88e5; text-align: center; margin: 0;'>🖼️ השוו כמה סגנונות במקביל 🖼️</h3>
+    </div>
+    """, unsafe_allow_html=True)
+
+    selected_names = st.multiselect(
+        "בחרו עד {} סגנונות להשוואה".format(MAX_COMPARE_STYLES),
+        [s.name for s in styles],
+        max_selections=MAX_COMPARE_STYLES,
+        key=f"{key}_styles"
+    )
+
+    if st.button("✨ צרו את כל הסגנונות שנבחרו ✨", key=f"{key}_run") and selected_names:
+        prompt = await get_prompt()
+        if not prompt:
+            st.warning("נא להוסיף תיאור לתמונה")
+        else:
+            selected_styles = [s for s in styles if s.name in selected_names]
+            cols = st.columns(2)
+            placeholders = {}
+            for idx, style in enumerate(selected_styles):
+                with cols[idx % 2]:
+                    placeholders[style.name] = st.empty()
+                    placeholders[style.name].info(f"⏳ {style.name}")
+
+            results = {}
+            batch = BatchGenerator(get_generator())
+            async for style, image in batch.generate_styles_async(prompt, selected_styles):
+                if image:
+                    results[style.name] = image
+                    get_style_catalog().record_usage(style.name)
+                    placeholders[style.name].image(image.data, caption=style.name)
+                else:
+                    placeholders[style.name].error(f"אירעה שגיאה ביצירת {style.name}")
+            st.session_state[f"{key}_results"] = results
+            st.rerun()
+
+    results = st.session_state.get(f"{key}_results") or {}
+    cols = st.columns(2)
+    for idx, (name, image) in enumerate(results.items()):
+        with cols[idx % 2]:
+            st.image(image.data, caption=name)
+            if st.button(f"בחרו את {name}", key=f"{key}_pick_{idx}"):
+                return name, image
+    return None
@@ -0,0 +1,135 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+from utils import http_client
+from utils.image_payload import ImagePayload
+from utils import tracing
+
+# Load environment variables
+load_dotenv()
+
+
+class TelegramDispatcher:
+    """
+    Fire-and-forget Telegram notifications. Pages only enqueue; a background thread
+    with its own long-lived event loop owns the sender and its connection pool,
+    caches the bot token check, drops duplicate images and sends bursts as one album.
+    """
+
+    def __init__(self, sender, batch_window: Optional[float] = None, max_queue: Optional[int] = None,
+                 verify_ttl: Optional[float] = None):
+        self.sender = sender
+        self.batch_window = batch_window if batch_window is not None else float(os.getenv("TELEGRAM_BATCH_WINDOW", "1.0"))
+        self.max_queue = max_queue or int(os.getenv("TELEGRAM_MAX_QUEUE", "100"))
+        self.verify_ttl = verify_ttl if verify_ttl is not None else float(os.getenv("TELEGRAM_VERIFY_TTL", "3600"))
+        self.max_batch = 10  # Telegram album limit
+
+        self._token_ok = None
+        self._verified_at = 0.0
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = self._loop.create_task(self._consume())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def enqueue(self, image: ImagePayload, caption: str) -> bool:
+        """Queue an image for sending; never blocks the caller"""
+        if not self._thread.is_alive():
+            return False
+        # The send happens on the dispatcher thread; remember whose trace it belongs to
+        trace_id = tracing.current_trace_id()
+
+        def _put():
+            try:
+                self._queue.put_nowait((image, caption, trace_id))
+            except asyncio.QueueFull:
+                print("Telegram queue full, dropping notification")
+
+        self._loop.call_soon_threadsafe(_put)
+        return True
+
+    async def _verify(self) -> bool:
+        now = time.monotonic()
+        # A failed check is retried sooner than a successful one expires
+        ttl = self.verify_ttl if self._token_ok else min(self.verify_ttl, 60.0)
+        if self._token_ok is None or now - self._verified_at > ttl:
+            self._token_ok = await self.sender.verify_bot_token()
+            self._verified_at = now
+        return self._token_ok
+
+    async def _collect_batch(self) -> list:
+        """First item blocks; then gather whatever else arrives within the batch window"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.batch_window
+        while len(batch) < self.max_batch:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _coalesce(batch: list) -> list:
+        """Same image queued twice (e.g. re-picked from the cache) is sent once, with the latest caption"""
+        unique = {}
+        for image, caption, trace_id in batch:
+            unique[hashlib.sha1(image.view).hexdigest()] = (image, caption, trace_id)
+        return list(unique.values())
+
+    async def _send(self, items: list):
+        if not await self._verify():
+            print("Bot token verification failed, dropping Telegram notifications")
+            return
+        # An album can mix sessions; it is traced under the first one
+        with tracing.span("telegram.send", trace_id=items[0][2], images=len(items)):
+            if len(items) == 1:
+                image, caption, _ = items[0]
+                await self.sender.send_image(image, caption=caption)
+            else:
+                await self.sender.send_media_group([(image, caption) for image, caption, _ in items])
+
+    async def _consume(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._send(self._coalesce(batch))
+            except Exception as e:
+                print(f"Failed to send to Telegram: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _drain(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print("Telegram queue not drained before shutdown")
+        self._worker.cancel()
+        await http_client.close_async_session()
+
+    def shutdown(self, timeout: float = 5.0):
+        """Flush pending notifications, close the pool and stop the loop"""
+        if not self._thread.is_alive():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._drain(timeout), self._loop)
+        try:
+            future.result(timeout + 1)
+        except Exception as e:
+            print(f"Error shutting down Telegram dispatcher: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
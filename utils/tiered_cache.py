@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def make_key(*parts) -> str:
+    """Build a content-addressed cache key from bytes/str/number parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, memoryview):
+            part = part.tobytes()
+        if not isinstance(part, (bytes, bytearray)):
+            part = str(part).encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """Two-tier cache: in-memory LRU in front of a SQLite table with TTL and size eviction"""
+
+    def __init__(self, namespace: str, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, memory_size: Optional[int] = None):
+        self.namespace = namespace
+        cache_dir = os.getenv("CACHE_DIR", ".cache")
+        self.path = path or os.path.join(cache_dir, f"{namespace}.sqlite3")
+        self.ttl = ttl if ttl is not None else float(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.memory_size = memory_size if memory_size is not None else int(os.getenv("CACHE_MEMORY_SIZE", "128"))
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = self._open_db()
+
+    def _open_db(self):
+        """Open the SQLite tier; fall back to memory only if the disk is not writable"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            return db
+        except (OSError, sqlite3.Error) as e:
+            print(f"Cache '{self.namespace}' running without disk tier: {str(e)}")
+            return None
+
+    def _remember(self, key: str, value: Any, created: float):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self.ttl or now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM entries WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        if not self.ttl or now - row[1] < self.ttl:
+                            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                            value = json.loads(row[0])
+                            self._remember(key, value, row[1])
+                            self.disk_hits += 1
+                            return value
+                        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                except sqlite3.Error as e:
+                    print(f"Cache read failed: {str(e)}")
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serialisable value in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is None:
+                return
+            try:
+                encoded = json.dumps(value, ensure_ascii=False)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, encoded, len(encoded.encode('utf-8')), now, now)
+                )
+                self._writes += 1
+                if self._writes % 32 == 1:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                print(f"Cache write failed: {str(e)}")
+
+    def _evict(self, now: float):
+        """Drop expired rows, then least recently used rows until under the byte budget"""
+        if self.ttl:
+            self._db.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        if not self.max_bytes:
+            return
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Test functionality
+if __name__ == "__main__":
+    cache = TieredCache("example", path=":memory:")
+    key = make_key(b"image-bytes", "model", 0.7)
+    print(f"First lookup: {cache.get(key)}")
+    cache.set(key, "A description")
+    print(f"Second lookup: {cache.get(key)}")
+    print(cache.stats())
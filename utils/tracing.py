@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import queue
+import atexit
+import secrets
+import threading
+import contextvars
+import functools
+import inspect
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "photo-to-photo")
+
+_listeners: List[Callable[["Span"], None]] = []
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def new_trace_id() -> str:
+    """32 hex characters, the W3C / OpenTelemetry trace id format"""
+    return secrets.token_hex(16)
+
+
+def set_trace_id(trace_id: Optional[str]):
+    """Make every span started from this context (and tasks/threads bound to it) part of trace_id"""
+    _trace_id.set(trace_id)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+class Span:
+    """One timed stage. Durations come from the monotonic clock; the wall clock only anchors the start."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "error",
+                 "start_unix_ns", "_start", "duration")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error = None
+        self.start_unix_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_unix_ns": self.start_unix_ns,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes):
+    """
+    Time a block as a child of the current span. trace_id overrides the context's
+    trace, for work done on behalf of a session from another thread.
+    """
+    parent = _current_span.get()
+    trace_id = trace_id or (parent.trace_id if parent else None) or _trace_id.get() or new_trace_id()
+    parent_id = parent.span_id if parent and parent.trace_id == trace_id else None
+    current = Span(name, trace_id, parent_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        for listener in _listeners:
+            try:
+                listener(current)
+            except Exception as e:
+                print(f"Error in span listener: {str(e)}")
+        _processor.submit(current)
+
+
+def add_listener(listener: Callable[[Span], None]):
+    """Call listener(span) synchronously as every span finishes, e.g. to feed latency histograms"""
+    _listeners.append(listener)
+
+
+def annotate(**attributes):
+    """Add attributes to the current span, if there is one"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of span() for plain and async functions"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(func):
+    """Carry the caller's trace into a thread pool or thread: executor.submit(bind(f), ...)"""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func)
+
+
+class JsonlExporter:
+    """Appends one JSON object per span to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for item in spans:
+                f.write(json.dumps(item.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+class OtlpHttpExporter:
+    """Posts spans as OTLP/JSON to a collector, e.g. http://localhost:4318"""
+
+    def __init__(self, endpoint: str):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+
+    @staticmethod
+    def _value(value) -> dict:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _span(self, item: Span) -> dict:
+        otlp = {
+            "traceId": item.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 1,
+            "startTimeUnixNano": str(item.start_unix_ns),
+            "endTimeUnixNano": str(item.start_unix_ns + int(item.duration * 1e9)),
+            "attributes": [{"key": k, "value": self._value(v)} for k, v in item.attributes.items()],
+            "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+        }
+        if item.parent_id:
+            otlp["parentSpanId"] = item.parent_id
+        return otlp
+
+    def export(self, spans: List[Span]):
+        from utils import http_client
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [self._span(item) for item in spans]}],
+            }]
+        }
+        http_client.post(self.url, json=body, timeout=(2, 5)).raise_for_status()
+
+
+class SpanProcessor:
+    """Hands finished spans to the exporters from a background thread, so a slow exporter never delays a page"""
+
+    def __init__(self, exporters: List, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.exporters = exporters
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        if exporters:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Span):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            pass  # Dropping spans beats blocking the request
+
+    def _drain(self) -> List[Span]:
+        spans = []
+        while True:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                return spans
+
+    def _export(self, spans: List[Span]):
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                print(f"Error exporting spans with {type(exporter).__name__}: {str(e)}")
+
+    def _run(self):
+        while True:
+            try:
+                spans = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            self._export(spans + self._drain())
+
+    def flush(self):
+        spans = self._drain()
+        if spans:
+            self._export(spans)
+
+
+def _build_processor() -> SpanProcessor:
+    exporters = []
+    trace_file = os.getenv("TRACE_FILE")
+    if trace_file:
+        exporters.append(JsonlExporter(trace_file))
+    otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if otlp_endpoint:
+        exporters.append(OtlpHttpExporter(otlp_endpoint))
+    return SpanProcessor(exporters)
+
+
+_processor = _build_processor()
+atexit.register(_processor.flush)
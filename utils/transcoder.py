@@ -0,0 +1,61 @@
+import os
+from io import BytesIO
+from typing import Optional, Tuple, Union
+from PIL import Image
+from dotenv import load_dotenv
+from utils.image_payload import ImagePayload
+from utils import tracing
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_QUALITY = int(os.getenv("TRANSCODE_QUALITY", "90"))
+WHITE = (255, 255, 255)
+
+ImageBytes = Union[bytes, bytearray, memoryview]
+
+
+def flatten(img: Image.Image, background: Tuple[int, int, int] = WHITE) -> Image.Image:
+    """RGB copy of img with any transparency (RGBA, LA, P with a transparent index) composited onto background"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        flat = Image.new("RGB", img.size, background)
+        flat.paste(img, mask=img.split()[3])
+        return flat
+    if img.mode != "RGB":
+        return img.convert("RGB")
+    return img
+
+
+def encode(img: Image.Image, format: str = "JPEG", quality: int = DEFAULT_QUALITY) -> bytes:
+    """Encode to bytes in memory; metadata (EXIF, ICC) is not carried over"""
+    format = format.upper()
+    if format in ("JPEG", "WEBP"):
+        img = flatten(img)
+    output = BytesIO()
+    img.save(output, format=format, quality=quality, optimize=True)
+    return output.getvalue()
+
+
+@tracing.traced("encode")
+def transcode(data: ImageBytes, format: str = "JPEG", quality: int = DEFAULT_QUALITY,
+              max_side: Optional[int] = None) -> bytes:
+    """Re-encode image bytes to another format without touching the filesystem"""
+    with Image.open(BytesIO(data)) as img:
+        if max_side and max(img.size) > max_side:
+            if img.format == "JPEG":
+                img.draft("RGB", (max_side, max_side))
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+        return encode(img, format, quality)
+
+
+def transcode_payload(payload: ImagePayload, format: str = "JPEG", quality: int = DEFAULT_QUALITY,
+                      accept: Tuple[str, ...] = ()) -> ImagePayload:
+    """
+    Payload in the requested format. Payloads already in that format, or in one of the
+    accepted mime types, are returned as they are.
+    """
+    target = Image.MIME.get(format.upper())
+    if payload.mime_type == target or payload.mime_type in accept:
+        return payload
+    return ImagePayload(transcode(payload.view, format, quality), target, payload.width, payload.height)
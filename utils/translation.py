@@ -0,0 +1,136 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from deep_translator import GoogleTranslator
+from utils.tiered_cache import TieredCache, make_key
+from utils import tracing
+
+SEGMENT_SEPARATOR = "\n\n"
+MAX_REQUEST_CHARS = 4500  # GoogleTranslator rejects payloads over 5000 characters
+
+
+class TranslationService:
+    """
+    Memoized Google translation shared by all pages: a persistent cache keyed by
+    (text hash, source, target), several segments per request, and background prefetch.
+    """
+
+    def __init__(self, cache: Optional[TieredCache] = None, max_workers: int = 2):
+        self.cache = cache if cache is not None else TieredCache("translations")
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+        self._inflight: Dict[str, Future] = {}
+        # Re-entrant: a future that is already done runs its callback inside prefetch()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(text: str, source: str, target: str) -> str:
+        return make_key(text, source, target)
+
+    def _call(self, text: str, source: str, target: str) -> str:
+        # A translator object keeps per-request state, so never share one between threads
+        return GoogleTranslator(source=source, target=target).translate(text)
+
+    def translate(self, text: str, target: str = 'en', source: str = 'auto') -> str:
+        if not text:
+            return ""
+        with tracing.span("translate", source=source, target=target, chars=len(text)) as translate_span:
+            key = self._key(text, source, target)
+            cached = self.cache.get(key)
+            translate_span.set(cached=cached is not None)
+            if cached is not None:
+                return cached
+
+            with self._lock:
+                future = self._inflight.get(key)
+            if future is not None:
+                # Already being fetched by a prefetch
+                return future.result()
+            return self._fetch(key, text, source, target)
+
+    def _fetch(self, key: str, text: str, source: str, target: str) -> str:
+        translated = self._call(text, source, target)
+        if translated:
+            self.cache.set(key, translated)
+        return translated
+
+    def translate_batch(self, texts: List[str], target: str = 'en', source: str = 'auto') -> List[str]:
+        """Translate many segments, sending all cache misses in as few requests as possible"""
+        results = {}
+        missing = []
+        for text in dict.fromkeys(t for t in texts if t):
+            cached = self.cache.get(self._key(text, source, target))
+            if cached is not None:
+                results[text] = cached
+            else:
+                missing.append(text)
+
+        for chunk in self._chunks(missing):
+            for text, translated in zip(chunk, self._translate_chunk(chunk, source, target)):
+                results[text] = translated
+                if translated:
+                    self.cache.set(self._key(text, source, target), translated)
+
+        return [results.get(text, "") if text else "" for text in texts]
+
+    def _chunks(self, texts: List[str]):
+        chunk, size = [], 0
+        for text in texts:
+            if chunk and size + len(text) + len(SEGMENT_SEPARATOR) > MAX_REQUEST_CHARS:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(text)
+            size += len(text) + len(SEGMENT_SEPARATOR)
+        if chunk:
+            yield chunk
+
+    def _translate_chunk(self, chunk: List[str], source: str, target: str) -> List[str]:
+        joinable = len(chunk) > 1 and not any(SEGMENT_SEPARATOR in text for text in chunk)
+        if joinable:
+            translated = self._call(SEGMENT_SEPARATOR.join(chunk), source, target) or ""
+            parts = [part.strip() for part in translated.split(SEGMENT_SEPARATOR)]
+            if len(parts) == len(chunk):
+                return parts
+        # Segments did not survive the round trip intact; translate them one by one
+        return [self._call(text, source, target) for text in chunk]
+
+    def prefetch(self, text: str, target: str = 'en', source: str = 'auto') -> Optional[Future]:
+        """Start translating in the background so a later translate() call finds it ready"""
+        if not text:
+            return None
+        key = self._key(text, source, target)
+        if self.cache.get(key) is not None:
+            return None
+        return self._start_fetch(key, text, source, target)
+
+    def _start_fetch(self, key: str, text: str, source: str, target: str) -> Future:
+        """The in-flight fetch for key, starting one if there is none"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self.executor.submit(self._fetch, key, text, source, target)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    async def translate_async(self, text: str, target: str = 'en', source: str = 'auto') -> str:
+        """translate() without blocking the event loop; shares in-flight requests with prefetch()"""
+        if not text:
+            return ""
+        with tracing.span("translate", source=source, target=target, chars=len(text)) as translate_span:
+            key = self._key(text, source, target)
+            cached = self.cache.get(key)
+            translate_span.set(cached=cached is not None)
+            if cached is not None:
+                return cached
+            future = self._start_fetch(key, text, source, target)
+            # Shielded: cancelling this caller must not cancel a fetch other callers share
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.cache.close()
@@ -1,27 +1,38 @@
 import os
-import requests
 from urllib.parse import urlencode
+from utils import http_client
+from utils.image_payload import ImagePayload
 
 class UnsplashGenerator:
     def __init__(self):
         self.access_key = os.getenv("UNSPLASH_ACCESS_KEY")
         self.base_url = "https://api.unsplash.com/search/photos"
     
-    def generate_image(self, query):
+    def search(self, query):
+        """URL of the best matching stock photo, or None"""
         # URL-encode the query
         encoded_query = urlencode({'query': query})
         url = f"{self.base_url}?{encoded_query}&client_id={self.access_key}"
-        response = requests.get(url)
+        response = http_client.get(url)
         data = response.json()
         if data['results']:
             return data['results'][0]['urls']['regular']
         return None
 
+    def generate_image(self, prompt, model_name=None, style=None):
+        """Same interface as the other generators: the best matching photo as an ImagePayload"""
+        image_url = self.search(prompt)
+        if not image_url:
+            return None
+        response = http_client.get(image_url)
+        response.raise_for_status()
+        return ImagePayload.from_bytes(response.content)
+
 # Example usage
 if __name__ == "__main__":
     unsplash = UnsplashGenerator()
     query = "A futuristic city with twisted glass and chrome skyscrapers, floating bridges, and flying cars between buildings glowing in neon colors"
-    image_url = unsplash.generate_image(query)
+    image_url = unsplash.search(query)
     if image_url:
         print(f"Image URL for '{query}': {image_url}")
     else:
@@ -0,0 +1,77 @@
+import os
+import time
+import threading
+import importlib
+from dotenv import load_dotenv
+from utils import tracing
+
+# Load environment variables
+load_dotenv()
+
+ENABLED = os.getenv("WARMUP", "1").lower() in ("1", "true", "yes")
+
+# Heavy third-party clients first, then the app modules that pull them in
+MODULES = (
+    "PIL.Image",
+    "requests",
+    "aiohttp",
+    "numpy",
+    "deep_translator",
+    "groq",
+    "utils.translation",
+    "utils.groq_image_captioner",
+    "utils.pollinations_generator",
+    "utils.generator_backends",
+    "pages.1_upload",
+    "pages.2_process",
+    "pages.3_result",
+)
+
+# Registry resources built ahead of the first session that needs them
+RESOURCES = tuple(
+    name.strip() for name in os.getenv("WARMUP_RESOURCES", "style_catalog,captioner,translation_service,generator").split(",") if name.strip()
+)
+
+_started = False
+_lock = threading.Lock()
+
+
+def _warm_up():
+    from utils import http_client
+    from utils.registry import registry
+
+    start = time.perf_counter()
+    with tracing.span("warmup") as current:
+        failed = []
+        for module in MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                # e.g. an optional backend whose package is not installed
+                failed.append(module)
+                print(f"Warm-up could not import {module}: {str(e)}")
+        http_client.get_session()
+        for name in RESOURCES:
+            try:
+                registry.get(name)
+            except Exception as e:
+                failed.append(name)
+                print(f"Warm-up could not build {name}: {str(e)}")
+        current.set(modules=len(MODULES), resources=len(RESOURCES), failed=",".join(failed))
+    print(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+
+def start_warmup() -> bool:
+    """
+    Import heavy clients and build shared resources in a background thread, once per process.
+    Call it after the first page has rendered, so a cold replica paints before paying for imports.
+    """
+    global _started
+    if not ENABLED:
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+    return True